@@ -0,0 +1,110 @@
+"""
+Compares the disjoint-set group_textlines in pdf_extractor/paragraphs.py with
+the previous patched implementation on generated PDFs.
+
+Usage: python benchmarks/bench_group_textlines.py [num_pages]
+"""
+import os
+import sys
+import time
+from io import BytesIO
+
+parser_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../covidscholar_database/parse'
+    )
+)
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
+from pdfminer.layout import LTLayoutContainer, LTTextLineHorizontal, LTTextBoxHorizontal, LTTextBoxVertical
+from pdfminer.utils import Plane, uniq
+
+from pdf_extractor import paragraphs
+from pdf_corpus import single_column_pdf, two_column_pdf
+
+
+def legacy_group_textlines(self, laparams, lines):
+    """group_textlines as patched before the disjoint-set rewrite, kept as reference"""
+    plane = Plane(self.bbox)
+    plane.extend(lines)
+    boxes = {}
+    for line in lines:
+        neighbors = line.find_neighbors(plane, laparams.line_margin)
+        if line not in neighbors or not line.get_text().strip():
+            continue
+
+        true_margin = laparams.line_margin
+        for obj1 in neighbors:
+            if obj1 is line:
+                continue
+            margin = min(abs(obj1.y0 - line.y1), abs(obj1.y1 - line.y0))
+            margin = margin * 1.05 / line.height
+            if margin < true_margin:
+                true_margin = margin
+
+        neighbors = line.find_neighbors(plane, true_margin)
+        if line not in neighbors:
+            continue
+
+        members = []
+        for obj1 in neighbors:
+            if not obj1.get_text().strip():
+                continue
+            members.append(obj1)
+            if obj1 in boxes:
+                members.extend(boxes.pop(obj1))
+        if isinstance(line, LTTextLineHorizontal):
+            box = LTTextBoxHorizontal()
+        else:
+            box = LTTextBoxVertical()
+        for obj in uniq(members):
+            box.add(obj)
+            boxes[obj] = box
+    done = set()
+    for line in lines:
+        if line not in boxes:
+            continue
+        box = boxes[line]
+        if box in done:
+            continue
+        done.add(box)
+        if not box.is_empty():
+            yield box
+
+
+def timed(func, totals):
+    def wrapper(self, laparams, lines):
+        start = time.perf_counter()
+        boxes = list(func(self, laparams, lines))
+        totals[0] += time.perf_counter() - start
+        return iter(boxes)
+    return wrapper
+
+
+def run(name, pdf, implementation):
+    totals = [0.0]
+    LTLayoutContainer.group_textlines = timed(implementation, totals)
+    start = time.perf_counter()
+    result = paragraphs.extract_paragraphs_pdf(BytesIO(pdf), return_dicts=True)
+    total = time.perf_counter() - start
+    LTLayoutContainer.group_textlines = paragraphs.group_textlines
+    return result, total, totals[0]
+
+
+if __name__ == '__main__':
+    num_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    corpus = {
+        'single_column': single_column_pdf(num_pages),
+        'two_column': two_column_pdf(num_pages),
+    }
+    print('%-15s %-8s %12s %16s' % ('document', 'method', 'extract (s)', 'grouping (s)'))
+    for name, pdf in corpus.items():
+        legacy, legacy_total, legacy_grouping = run(name, pdf, legacy_group_textlines)
+        current, current_total, current_grouping = run(name, pdf, paragraphs.group_textlines)
+        print('%-15s %-8s %12.3f %16.3f' % (name, 'legacy', legacy_total, legacy_grouping))
+        print('%-15s %-8s %12.3f %16.3f' % (name, 'current', current_total, current_grouping))
+        if [p['text'] for p in legacy] != [p['text'] for p in current]:
+            print('%-15s WARNING: paragraphs differ between implementations' % name)
@@ -0,0 +1,188 @@
+"""
+Benchmark of Parser.parse for every source, on the synthetic corpora of parser_corpus.py.
+
+The network helpers the parsers call (opencitations, NCBI idconv, crossref Works)
+are replaced by stubs returning empty results, and any other HTTP request made
+through requests raises, so the numbers only measure parsing. Run it before and
+after a parser version bump to catch regressions.
+
+For each source it reports docs/sec (best of --repeat passes, each with a fresh
+parser), the number of documents whose parse raised, and from a separate pass
+under tracemalloc the memory allocated per document and still held by the results,
+the number of live blocks per document and the peak traced memory.
+
+Usage:
+    python benchmarks/bench_parsers.py
+    python benchmarks/bench_parsers.py --sources elsevier dimensions --count 5000 --size 2
+    python benchmarks/bench_parsers.py --repeat 3 --fields --json bench_output.json
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+parser_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../covidscholar_database/parse'
+    )
+)
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
+import requests
+
+import parser_corpus
+
+# biorxiv creates its parser at import time, with a client to COVID_DB. The client
+# connects lazily and is only used to extract full text, which is off here.
+os.environ.setdefault('COVID_DB', 'covidscholar_benchmark')
+
+# source -> (module of the parse folder, function of the module returning a parser)
+PARSERS = {
+    'cord19': ('cord19', lambda m: m.CORD19Parser(collection='CORD_comm_use_subset')),
+    'litcovid': ('litcovid', lambda m: m.LitCovidParser()),
+    'elsevier': ('elsevier', lambda m: m.ElsevierParser()),
+    'dimensions': ('dimensions', lambda m: m.DimensionsParser(collection='Dimensions_publications')),
+    'lens_patents': ('lens_patents', lambda m: m.LensPatentParser()),
+    'biorxiv': ('biorxiv', lambda m: m.BiorxivParser(parse_full_text=False)),
+    'google_form_submissions': ('google_form_submissions', lambda m: m.GoogleSubmissionParser()),
+}
+
+NETWORK_STUBS = {
+    'find_references': lambda doi: [],
+    'find_cited_by': lambda doi: [],
+    'find_remaining_ids': lambda id: {'doi': None, 'pmcid': None, 'pubmed_id': None},
+}
+
+
+class StubWorks(object):
+    """Stands in for crossref.restful.Works"""
+
+    def doi(self, doi):
+        return {'type': 'journal-article'}
+
+
+def _no_network(self, method, url, *args, **kwargs):
+    raise RuntimeError('Network access during the parser benchmark: %s %s' % (method, url))
+
+
+def load_parser_module(name):
+    """Imports the module of a source and replaces its network helpers by stubs"""
+    module = importlib.import_module(PARSERS[name][0])
+    for helper, stub in NETWORK_STUBS.items():
+        if hasattr(module, helper):
+            setattr(module, helper, stub)
+    if hasattr(module, 'Works'):
+        module.Works = StubWorks
+    return module
+
+
+def parse_all(parser, docs):
+    """Parses docs, returns (results, number of errors, repr of the first error)"""
+    results = []
+    errors = 0
+    first_error = None
+    for doc in docs:
+        try:
+            results.append(parser.parse(doc))
+        except Exception as e:
+            errors += 1
+            if first_error is None:
+                first_error = repr(e)
+    return results, errors, first_error
+
+
+def run_source(name, count, seed=0, size=1, repeat=1, fields=False):
+    """
+    Benchmarks the parser of one source.
+
+    :return: (dict) measurements, with 'skipped' if the parser cannot be imported here
+    """
+    try:
+        module = load_parser_module(name)
+    except Exception as e:
+        return {'source': name, 'skipped': repr(e)}
+    make_parser = PARSERS[name][1]
+    docs = parser_corpus.generate(name, count, seed=seed, size=size)
+
+    times = []
+    for _ in range(repeat):
+        parser = make_parser(module)
+        start = time.perf_counter()
+        _, errors, first_error = parse_all(parser, docs)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+
+    parser = make_parser(module)
+    tracemalloc.start()
+    results, _, _ = parse_all(parser, docs)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(x.count for x in snapshot.statistics('filename'))
+    del results
+
+    result = {
+        'source': name,
+        'docs': count,
+        'errors': errors,
+        'first_error': first_error,
+        'total_s': best,
+        'docs_per_s': count / best if best else float('inf'),
+        'kb_per_doc': current / 1024 / count,
+        'blocks_per_doc': blocks / count,
+        'peak_mb': peak / 1024 / 1024,
+    }
+
+    if fields:
+        parser = make_parser(module)
+        timings = parser.enable_timings()
+        parse_all(parser, docs)
+        parser.disable_timings()
+        result['fields'] = timings.to_records()
+        result['fields_report'] = timings.report()
+    return result
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sources', nargs='+', default=list(PARSERS), choices=list(PARSERS))
+    arg_parser.add_argument('--count', type=int, default=2000, help='documents per source')
+    arg_parser.add_argument('--size', type=int, default=1, help='multiplier of the long fields of each document')
+    arg_parser.add_argument('--repeat', type=int, default=1, help='keep the fastest of N passes')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--fields', action='store_true', help='also report the time spent in each field')
+    arg_parser.add_argument('--json', help='also write the results to this file')
+    args = arg_parser.parse_args()
+
+    requests.Session.request = _no_network
+
+    results = []
+    print('%-24s %6s %6s %10s %10s %10s %11s %9s' % (
+        'source', 'docs', 'errors', 'total (s)', 'docs/s', 'KB/doc', 'blocks/doc', 'peak (MB)'))
+    for source in args.sources:
+        result = run_source(source, args.count, seed=args.seed, size=args.size,
+                            repeat=args.repeat, fields=args.fields)
+        results.append(result)
+        if 'skipped' in result:
+            print('%-24s skipped: %s' % (source, result['skipped']))
+            continue
+        print('%-24s %6d %6d %10.3f %10.0f %10.2f %11.1f %9.1f' % (
+            source, result['docs'], result['errors'], result['total_s'], result['docs_per_s'],
+            result['kb_per_doc'], result['blocks_per_doc'], result['peak_mb']))
+        if result['first_error']:
+            print('    first error: %s' % result['first_error'])
+
+    if args.fields:
+        for result in results:
+            if 'fields_report' in result:
+                print()
+                print(result.pop('fields_report'))
+
+    if args.json:
+        with open(args.json, 'w') as fw:
+            json.dump(results, fw, indent=2)
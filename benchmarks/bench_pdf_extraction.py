@@ -0,0 +1,118 @@
+"""
+Benchmark of pdf_extractor/paragraphs.py on the generated corpus of pdf_corpus.py.
+
+Every (document, laparams preset) pair runs in a fresh process, so the reported
+peak RSS belongs to that extraction alone. Per-page times come from timing
+PDFPageInterpreter.process_page, which includes the layout analysis.
+
+Usage:
+    python benchmarks/bench_pdf_extraction.py
+    python benchmarks/bench_pdf_extraction.py --documents two_column tables --presets repo_default
+    python benchmarks/bench_pdf_extraction.py --repeat 3 --json bench_output.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from io import BytesIO
+
+parser_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../covidscholar_database/parse'
+    )
+)
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
+import pdf_corpus
+
+# laparams passed to extract_paragraphs_pdf, on top of paragraphs.default_laparams
+PRESETS = {
+    'repo_default': None,
+    'pdfminer_default': {'char_margin': 2.0, 'line_margin': 0.5},
+    'wide_char_margin': {'char_margin': 6.0},
+    'wide_line_margin': {'line_margin': 4.0},
+}
+
+
+def run_extraction(document, preset, seed):
+    """
+    Extracts one generated document and measures it. Meant to run in a child process.
+
+    :return: (dict) measurements
+    """
+    from pdf_extractor import paragraphs
+
+    pdf = pdf_corpus.generate(document, seed=seed)
+
+    page_times = []
+    process_page = paragraphs.PDFPageInterpreter.process_page
+
+    def timed_process_page(self, page):
+        start = time.perf_counter()
+        process_page(self, page)
+        page_times.append(time.perf_counter() - start)
+
+    paragraphs.PDFPageInterpreter.process_page = timed_process_page
+
+    start = time.perf_counter()
+    result = paragraphs.extract_paragraphs_pdf(BytesIO(pdf), laparams=PRESETS[preset])
+    total = time.perf_counter() - start
+
+    return {
+        'document': document,
+        'preset': preset,
+        'pdf_bytes': len(pdf),
+        'pages': len(page_times),
+        'paragraphs': len(result),
+        'total_s': total,
+        'mean_page_s': sum(page_times) / max(1, len(page_times)),
+        'max_page_s': max(page_times or [0]),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _child(queue, document, preset, seed):
+    queue.put(run_extraction(document, preset, seed))
+
+
+def measure(document, preset, seed=0):
+    """Runs run_extraction in a fresh process and returns its measurements"""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(queue, document, preset, seed))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--documents', nargs='+', default=list(pdf_corpus.CORPUS), choices=list(pdf_corpus.CORPUS))
+    arg_parser.add_argument('--presets', nargs='+', default=list(PRESETS), choices=list(PRESETS))
+    arg_parser.add_argument('--repeat', type=int, default=1, help='keep the fastest of N runs')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', help='also write the results to this file')
+    args = arg_parser.parse_args()
+
+    results = []
+    print('%-20s %-18s %5s %6s %9s %11s %10s %9s' % (
+        'document', 'preset', 'pages', 'paras', 'total (s)', 'page (ms)', 'max (ms)', 'rss (MB)'))
+    for document in args.documents:
+        for preset in args.presets:
+            runs = [measure(document, preset, args.seed) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r['total_s'])
+            results.append(best)
+            print('%-20s %-18s %5d %6d %9.3f %11.1f %10.1f %9.1f' % (
+                document, preset, best['pages'], best['paragraphs'], best['total_s'],
+                best['mean_page_s'] * 1000, best['max_page_s'] * 1000, best['peak_rss_mb']))
+
+    if args.json:
+        with open(args.json, 'w') as fw:
+            json.dump(results, fw, indent=2)
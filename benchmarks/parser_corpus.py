@@ -0,0 +1,267 @@
+"""
+Deterministic generator of raw source documents for the parser benchmarks.
+
+One generator per raw format, each giving documents shaped like the records of the
+source collection (the fields read by the corresponding parser), so that every
+parser can run on a synthetic corpus without a database. The same seed always
+gives the same documents; size scales the long fields (authors, body text,
+references) of each document.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from pdf_corpus import WORDS
+
+FIRST_NAMES = 'John Jane Wei Maria Ahmed Yuki Olga Pierre Ana Kofi Lars Priya'.split()
+LAST_NAMES = 'Smith Zhang Garcia Muller Rossi Kim Ivanova Dubois Silva Mensah Berg Patel'.split()
+JOURNALS = [
+    'The Lancet', 'Nature', 'Journal of Virology', 'Clinical Infectious Diseases',
+    'BMJ', 'Emerging Infectious Diseases', 'Journal of Medical Virology',
+]
+MONTHS = 'Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec'.split()
+
+
+def _sentence(rng, num_words=None):
+    num_words = num_words or rng.randint(6, 18)
+    words = [rng.choice(WORDS) for _ in range(num_words)]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _text(rng, num_sentences):
+    return ' '.join(_sentence(rng) for _ in range(num_sentences))
+
+
+def _doi(rng, i):
+    return '10.%d/synthetic.%d.%d' % (rng.randint(1000, 9999), i, rng.randint(0, 99999))
+
+
+def _name(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _date(rng):
+    return datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 365))
+
+
+def cord19_doc(rng, i, size=1):
+    """ A CORD-19 record: the paper JSON (metadata, abstract, body_text, bib_entries)
+    with the crossref result, or for odd i a metadata.csv only record."""
+    doi = _doi(rng, i)
+    date = _date(rng)
+    doc = {
+        '_id': i,
+        'doi': doi,
+        'last_updated': date,
+        'metadata': {
+            'title': _sentence(rng),
+            'authors': [],
+        },
+        'csv_raw_result': {
+            'cord_uid': 'cord%06d' % i,
+            'authors': '; '.join('%s, %s' % (last, first) for first, last in (_name(rng) for _ in range(4 * size))),
+            'publish_time': date.strftime('%Y-%m-%d'),
+            'abstract': _text(rng, 5 * size),
+            'source_x': rng.choice(['PMC', 'Elsevier', 'medRxiv', 'WHO']),
+            'license': rng.choice(['cc-by', 'els-covid', 'no-cc']),
+            'pmcid': 'PMC%d' % (7000000 + i) if i % 3 else '',
+            'pubmed_id': str(32000000 + i) if i % 4 else '',
+            'WHO #Covidence': '#%d' % i if i % 5 == 0 else '',
+        },
+    }
+    if i % 2:
+        return doc
+
+    for _ in range(4 * size):
+        first, last = _name(rng)
+        doc['metadata']['authors'].append({
+            'first': first, 'middle': [rng.choice('ABCDEFGH')] if rng.random() < 0.3 else [],
+            'last': last, 'suffix': '',
+            'email': '%s.%s@example.org' % (first.lower(), last.lower()) if rng.random() < 0.3 else '',
+            'affiliation': {'institution': 'University of %s' % rng.choice(LAST_NAMES)} if rng.random() < 0.7 else {},
+        })
+    doc['abstract'] = [{'text': _text(rng, 3), 'section': 'Abstract'} for _ in range(2 * size)]
+    doc['body_text'] = [
+        {'section': rng.choice(['Introduction', 'Methods', 'Results', 'Discussion']), 'text': _text(rng, 6)}
+        for _ in range(20 * size)
+    ]
+    doc['bib_entries'] = {
+        'BIBREF%d' % j: {
+            'ref_id': 'BIBREF%d' % j,
+            'title': _sentence(rng),
+            'year': rng.randint(1990, 2020),
+            'issn': '',
+            'other_ids': {'DOI': [_doi(rng, j)]} if rng.random() < 0.6 else {},
+        }
+        for j in range(30 * size)
+    }
+    doc['crossref_raw_result'] = {
+        'container-title': [rng.choice(JOURNALS)],
+        'short-container-title': [],
+        'ISSN': ['%04d-%04d' % (rng.randint(0, 9999), rng.randint(0, 9999))],
+        'published-print': {'date-parts': [[date.year, date.month]]},
+        'abstract': '' if rng.random() < 0.5 else _text(rng, 5 * size),
+        'assertion': [{'name': 'copyright', 'value': '(c) 2020 The Authors'}],
+    }
+    return doc
+
+
+def litcovid_doc(rng, i, size=1):
+    """ A LitCovid BioC JSON record, with the title and abstract passages."""
+    date = _date(rng)
+    journal = '%s. %d %s %d;%d(%d):%d-%d.' % (
+        rng.choice(JOURNALS), date.year, MONTHS[date.month - 1], date.day,
+        rng.randint(1, 400), rng.randint(1, 12), rng.randint(1, 500), rng.randint(500, 999))
+    doc = {
+        '_id': i,
+        'pmid': 32000000 + i,
+        'journal': journal,
+        'authors': ['%s %s' % (last, first[0] + rng.choice('ABCDEFGH')) for first, last in
+                    (_name(rng) for _ in range(4 * size))],
+        'passages': [
+            {'infons': {'type': 'title', 'journal': journal, 'year': str(date.year)}, 'text': _sentence(rng)},
+            {'infons': {'type': 'abstract'}, 'text': _text(rng, 8 * size)},
+        ],
+        'last_updated': date,
+    }
+    if i % 3:
+        doc['pmcid'] = 'PMC%d' % (7000000 + i)
+    return doc
+
+
+def elsevier_doc(rng, i, size=1):
+    """ An Elsevier_corona_meta record, whose meta is the API response as a JSON string,
+    with raw newlines in some strings like the real payloads."""
+    doi = _doi(rng, i)
+    date = _date(rng)
+    response = {
+        'full-text-retrieval-response': {
+            'coredata': {
+                'prism:doi': doi,
+                'eid': '1-s2.0-S%010d' % i,
+                'dc:title': _sentence(rng),
+                'dc:creator': [{'@_fa': 'true', '$': '%s, %s' % (last, first)} for first, last in
+                               (_name(rng) for _ in range(4 * size))],
+                'prism:publicationName': rng.choice(JOURNALS),
+                'prism:issn': '%04d%04d' % (rng.randint(0, 9999), rng.randint(0, 9999)),
+                'prism:coverDate': date.strftime('%Y-%m-%d'),
+                'dc:description': '\n                Abstract\n                ' + _text(rng, 6 * size),
+                'prism:copyright': '© 2020 Elsevier Ltd. All rights reserved.',
+                'openaccessUserLicense': 'http://www.elsevier.com/open-access/userlicense/1.0/',
+                'link': [
+                    {'@rel': 'self', '@href': 'https://api.elsevier.com/content/article/pii/S%010d' % i},
+                    {'@rel': 'scidir', '@href': 'https://www.sciencedirect.com/science/article/pii/S%010d' % i},
+                ],
+            },
+            'pubmed-id': str(32000000 + i),
+        }
+    }
+    return {
+        '_id': i,
+        'meta': json.dumps(response, ensure_ascii=False).replace('\\n', '\n'),
+        'mtime': date,
+    }
+
+
+def dimensions_doc(rng, i, size=1):
+    """ A row of the Dimensions COVID-19 publications export."""
+    date = _date(rng)
+    return {
+        '_id': i,
+        'doi': _doi(rng, i),
+        'title': _sentence(rng),
+        'authors': '; '.join('%s, %s' % (last, first) for first, last in (_name(rng) for _ in range(4 * size))),
+        'source_title': rng.choice(JOURNALS),
+        'publication_date': date.strftime('%Y-%m-%d') if i % 4 else '',
+        'publication_year': date.year,
+        'pubyear': date.year,
+        'abstract': _text(rng, 6 * size),
+        'source_linkout': '' if i % 2 else 'https://example.org/article/%d' % i,
+        'dimensions_url': 'https://app.dimensions.ai/details/publication/pub.%d' % i,
+        'pmcid': 'PMC%d' % (7000000 + i) if i % 3 else '',
+        'pmid': str(32000000 + i),
+        'last_updated': date,
+    }
+
+
+def lens_doc(rng, i, size=1):
+    """ A Scraper_lens_patents record."""
+    return {
+        '_id': i,
+        'Title': _sentence(rng).upper(),
+        'Published_Date': _date(rng),
+        'Abstract': _text(rng, 6 * size),
+        'Link': 'https://www.lens.org/lens/patent/%03d-%03d-%03d-%03d-%03d' % tuple(
+            rng.randint(0, 999) for _ in range(5)),
+        'last_updated': _date(rng),
+    }
+
+
+def biorxiv_doc(rng, i, size=1):
+    """ A Scraper_connect_biorxiv_org record."""
+    doi = '10.1101/2020.%02d.%02d.%08d' % (rng.randint(1, 12), rng.randint(1, 28), i)
+    return {
+        '_id': i,
+        'Doi': doi,
+        'Title': _sentence(rng),
+        'Authors': [{'Name': {'fn': first, 'ln': last}} for first, last in (_name(rng) for _ in range(5 * size))],
+        'Journal': rng.choice(['bioRxiv', 'medRxiv']),
+        'Publication_Date': _date(rng),
+        'Abstract': [_text(rng, 3) for _ in range(2 * size)],
+        'Link': 'https://www.biorxiv.org/content/%sv1' % doi,
+        'PDF_gridfs_id': None,
+        'last_updated': _date(rng),
+    }
+
+
+def google_form_doc(rng, i, size=1):
+    """ A google_form_submissions record, with the crossref result of the submitted DOI."""
+    date = _date(rng)
+    return {
+        '_id': i,
+        'doi': _doi(rng, i),
+        'title': [_sentence(rng)] if i % 2 else _sentence(rng),
+        'authors': [
+            {'name': '%s %s' % name, 'affiliation': [{'name': 'University of %s' % rng.choice(LAST_NAMES)}]
+             if rng.random() < 0.5 else []}
+            for name in (_name(rng) for _ in range(3 * size))
+        ],
+        'journal': [rng.choice(JOURNALS)],
+        'crossref_raw_result': {'message': {
+            'ISSN': ['%04d-%04d' % (rng.randint(0, 9999), rng.randint(0, 9999))],
+            'short-container-title': [],
+            'abstract': _text(rng, 4 * size),
+        }},
+        'publication_date': date,
+        'abstract': _text(rng, 4 * size) if i % 2 else None,
+        'link': 'https://example.org/submission/%d' % i,
+        'category_human': [rng.choice(['treatment', 'diagnosis', 'epidemiology', 'transmission'])],
+        'keywords': [rng.choice(WORDS) for _ in range(5)],
+        'summary_human': _text(rng, 2),
+        'last_updated': date,
+    }
+
+
+CORPUS = {
+    'cord19': cord19_doc,
+    'litcovid': litcovid_doc,
+    'elsevier': elsevier_doc,
+    'dimensions': dimensions_doc,
+    'lens_patents': lens_doc,
+    'biorxiv': biorxiv_doc,
+    'google_form_submissions': google_form_doc,
+}
+
+
+def generate(name, count, seed=0, size=1):
+    """
+    Generates a corpus of raw documents of one source.
+
+    :param name: (str) key of CORPUS
+    :param count: (int) number of documents
+    :param seed: (int) random seed
+    :param size: (int) multiplier of the long fields of each document
+    :return: (list) of (dict) raw documents
+    """
+    rng = random.Random('%s-%d' % (name, seed))
+    return [CORPUS[name](rng, i, size=size) for i in range(count)]
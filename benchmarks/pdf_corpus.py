@@ -0,0 +1,185 @@
+"""
+Deterministic PDF generator for the pdf_extractor benchmarks.
+
+PDFs are written by hand (uncompressed content streams, standard Helvetica font),
+so no network or extra dependency is needed and the same seed always gives the
+same bytes.
+"""
+import random
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+WORDS = (
+    'virus infection patients respiratory severe acute syndrome coronavirus '
+    'clinical cases protein binding receptor cells viral replication study '
+    'analysis data model transmission risk hospital treatment vaccine immune '
+    'response antibody samples results method sequence genome spike host '
+    'disease outbreak public health mortality incidence cohort trial dose'
+).split()
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(pages):
+    """
+    Writes a PDF document.
+
+    :param pages: (list) one list of (x, y, font_size, text) tuples per page
+    :return: (bytes) the PDF file
+    """
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in once the page object numbers are known
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    page_refs = []
+    for lines in pages:
+        stream = '\n'.join(
+            'BT /F1 %g Tf %.2f %.2f Td (%s) Tj ET' % (size, x, y, _escape(text))
+            for x, y, size, text in lines
+        ).encode('latin-1', 'replace')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_num = len(objects)
+        objects.append((
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_num)
+        ).encode('ascii'))
+        page_refs.append('%d 0 R' % len(objects))
+    objects[1] = ('<< /Type /Pages /Kids [%s] /Count %d >>'
+                  % (' '.join(page_refs), len(page_refs))).encode('ascii')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % num + obj + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    words[0] = words[0].capitalize()
+    return ' '.join(words) + '.'
+
+
+def _wrap(text, width, font_size):
+    # Helvetica averages about half an em per character
+    max_chars = max(1, int(width / (font_size * 0.5)))
+    lines, current = [], ''
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            lines.append(current)
+            current = word
+        else:
+            current = (current + ' ' + word).strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _columns_page(rng, page_num, columns, font_size=10, leading=12):
+    gutter = 24
+    margin = 54
+    width = (PAGE_WIDTH - 2 * margin - (columns - 1) * gutter) / columns
+    lines = [
+        (margin, PAGE_HEIGHT - 36, 8, 'medRxiv preprint doi: 10.1101/2020.00.00.000000'),
+        (PAGE_WIDTH / 2, 30, 8, str(page_num + 1)),
+    ]
+    for col in range(columns):
+        x = margin + col * (width + gutter)
+        y = PAGE_HEIGHT - 72
+        while y > 72:
+            paragraph = ' '.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+            for text in _wrap(paragraph, width, font_size):
+                if y <= 72:
+                    break
+                lines.append((x, y, font_size, text))
+                y -= leading
+            y -= leading * 1.5
+    return lines
+
+
+def _table_page(rng, page_num, font_size=8, leading=11):
+    lines = _columns_page(rng, page_num, 1)[:2]
+    y = PAGE_HEIGHT - 72
+    for text in _wrap('Table %d. ' % (page_num + 1) + _sentence(rng), PAGE_WIDTH - 108, 10):
+        lines.append((54, y, 10, text))
+        y -= 12
+    y -= 12
+    num_columns = rng.randint(4, 7)
+    cell_width = (PAGE_WIDTH - 108) / num_columns
+    header = [rng.choice(WORDS).capitalize() for _ in range(num_columns)]
+    for col, text in enumerate(header):
+        lines.append((54 + col * cell_width, y, font_size, text))
+    y -= leading
+    while y > 200:
+        for col in range(num_columns):
+            if col == 0:
+                text = rng.choice(WORDS)
+            else:
+                text = '%.2f (%d-%d)' % (rng.random() * 100, rng.randint(0, 50), rng.randint(50, 99))
+            lines.append((54 + col * cell_width, y, font_size, text))
+        y -= leading
+    y -= leading
+    for text in _wrap(' '.join(_sentence(rng) for _ in range(4)), PAGE_WIDTH - 108, 10):
+        lines.append((54, y, 10, text))
+        y -= 12
+    return lines
+
+
+def single_column_pdf(num_pages=10, seed=0):
+    """
+    :param num_pages: (int) number of pages
+    :param seed: (int) seed of the text generator
+    :return: (bytes) PDF with one column of paragraphs per page
+    """
+    rng = random.Random(seed)
+    return build_pdf([_columns_page(rng, i, 1) for i in range(num_pages)])
+
+
+def two_column_pdf(num_pages=10, seed=0):
+    """
+    :param num_pages: (int) number of pages
+    :param seed: (int) seed of the text generator
+    :return: (bytes) PDF with two dense columns of paragraphs per page
+    """
+    rng = random.Random(seed)
+    return build_pdf([_columns_page(rng, i, 2) for i in range(num_pages)])
+
+
+def tables_pdf(num_pages=10, seed=0):
+    """
+    :param num_pages: (int) number of pages
+    :param seed: (int) seed of the text generator
+    :return: (bytes) PDF with a captioned numeric table and a short paragraph per page
+    """
+    rng = random.Random(seed)
+    return build_pdf([_table_page(rng, i) for i in range(num_pages)])
+
+
+# name -> (generator, number of pages) of the standard benchmark corpus
+CORPUS = {
+    'single_column': (single_column_pdf, 10),
+    'two_column': (two_column_pdf, 10),
+    'tables': (tables_pdf, 10),
+    'long_single_column': (single_column_pdf, 120),
+}
+
+
+def generate(name, seed=0):
+    """
+    :param name: (str) key of CORPUS
+    :param seed: (int) seed of the text generator
+    :return: (bytes) the PDF
+    """
+    generator, num_pages = CORPUS[name]
+    return generator(num_pages, seed=seed)
@@ -5,15 +5,17 @@ import re
 from datetime import datetime
 import requests
 from covidscholar_database.parse.utils import clean_title, find_cited_by, find_references
+from doi_key import canonical_doi
 from covidscholar_database.parse.elsevier import ElsevierDocument
 from covidscholar_database.parse.google_form_submissions import GoogleFormSubmissionDocument
-from covidscholar_database.parse.litcovid import LitCovidCrossrefDocument, LitCovidPubmedDocument
+from covidscholar_database.parse.litcovid import LitCovidDocument
 from covidscholar_database.parse.biorxiv import BiorxivDocument
 from covidscholar_database.parse.cord19 import CORD19Document
 from covidscholar_database.parse.pho import PHODocument
 from covidscholar_database.parse.dimensions import DimensionsDocument
 from covidscholar_database.parse.lens_patents import LensPatentDocument
-from mongoengine import ListField, GenericReferenceField, DoesNotExist, DictField, MultipleObjectsReturned, FloatField, IntField
+from mongoengine import ListField, GenericReferenceField, DoesNotExist, DictField, MultipleObjectsReturned, FloatField, IntField, \
+    DynamicDocument
 
 class EntriesDocument(VespaDocument):
 
@@ -28,6 +30,7 @@ class EntriesDocument(VespaDocument):
     'cord_uid',
     'who_covidence', 'version', 'copyright',
     'document_type',
+    'doi_key',
     {"fields": ["doi",],
     "unique": True,
     "partialFilterExpression": {
@@ -66,18 +69,23 @@ class EntriesDocument(VespaDocument):
 entries_keys = [k for k in EntriesDocument._fields.keys() if (k[0] != "_" and k not in ["source_documents", "embeddings", "is_covid19_ML", "integer_id"])]
 
 def find_matching_doc(doc):
+    # doc is a parsed document, or a raw source document of which only the ids are parsed
+    if isinstance(doc, DynamicDocument):
+        doc = doc.parser.parse(doc.to_mongo(), lazy=True)
     #This could definitely be better but I can't figure out how to mangle mongoengine search syntax in the right way
     doi = doc['doi'] if doc['doi'] is not None else "_"
+    doi_key = canonical_doi(doc['doi']) or "_"
     pubmed_id = doc['pubmed_id'] if doc['pubmed_id'] is not None else "_"
     pmcid = doc['pmcid'] if doc['pmcid'] is not None else "_"
-    scopus_eid = doc['scopus_eid'] if doc['scopus_eid'] is not None else "_"
+    # only set by the parsers of sources that have it
+    scopus_eid = doc['scopus_eid'] if 'scopus_eid' in doc and doc['scopus_eid'] is not None else "_"
     try:
-        matching_doc = EntriesDocument.objects(Q(doi=doi) | Q(pubmed_id=pubmed_id) | Q(pmcid=pmcid) | Q(scopus_eid=scopus_eid)).no_cache().get()
+        matching_doc = EntriesDocument.objects(Q(doi_key=doi_key) | Q(doi=doi) | Q(pubmed_id=pubmed_id) | Q(pmcid=pmcid) | Q(scopus_eid=scopus_eid)).no_cache().get()
         return [matching_doc]
     except DoesNotExist:
         pass
     except MultipleObjectsReturned:
-        return [d for d in EntriesDocument.objects(Q(doi=doi) | Q(pubmed_id=pubmed_id) | Q(pmcid=pmcid) | Q(scopus_eid=scopus_eid)).no_cache()]
+        return [d for d in EntriesDocument.objects(Q(doi_key=doi_key) | Q(doi=doi) | Q(pubmed_id=pubmed_id) | Q(pmcid=pmcid) | Q(scopus_eid=scopus_eid)).no_cache()]
     return []
 
 # -*- coding: utf-8 -*-
@@ -207,12 +215,18 @@ parsed_collections = [
     BiorxivDocument,
     GoogleFormSubmissionDocument,
     PHODocument,
-    LitCovidCrossrefDocument,
-    LitCovidPubmedDocument,
+    LitCovidDocument,
     CORD19Document,
     ElsevierDocument,
 ]
 
+def find_unmatched_sources(unparsed_collection):
+    """ Yields the raw documents of a source collection that match no entry. Only
+    their ids are parsed, so this is cheap enough to audit a whole collection."""
+    for document in unparsed_collection.objects.no_cache():
+        if not find_matching_doc(document):
+            yield document
+
 def build_entries():
     i=0
     for collection in parsed_collections:
@@ -1,18 +1,32 @@
 import os
+import sys
 import itertools
+
+# the parsers import each other flat, from the parse folder
+parser_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../parse'
+    )
+)
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
 from mongoengine import connect, DoesNotExist
 from covidscholar_database.parse.elsevier import UnparsedElsevierDocument
 from covidscholar_database.parse.google_form_submissions import UnparsedGoogleFormSubmissionDocument
-from covidscholar_database.parse.litcovid import UnparsedLitCovidCrossrefDocument, UnparsedLitCovidPubmedXMLDocument
+from covidscholar_database.parse.litcovid import UnparsedLitCovidDocument
 from covidscholar_database.parse.biorxiv import UnparsedBiorxivDocument
 from covidscholar_database.parse.cord19 import UnparsedCORD19CustomDocument, UnparsedCORD19CommDocument, \
     UnparsedCORD19NoncommDocument, UnparsedCORD19XrxivDocument
-from covidscholar_database.parse.pho import UnparsedPHODocument
+from covidscholar_database.parse.pho import UnparsedPHODocument, extract_synopses
 from covidscholar_database.parse.dimensions import UnparsedDimensionsDataDocument, UnparsedDimensionsPubDocument, \
     UnparsedDimensionsTrialDocument
 from covidscholar_database.parse.lens_patents import UnparsedLensDocument
+# the flat module the parsers import, so Parser.timings is the switch they read
+from base import Parser, ParseTimings
 from joblib import Parallel, delayed
-from covidscholar_database.build.entries import build_entries
+from covidscholar_database.builder.entries import build_entries
 
 
 def init_mongoengine():
@@ -36,19 +50,37 @@ unparsed_collection_list = [UnparsedDimensionsDataDocument,
                             UnparsedCORD19NoncommDocument,
                             UnparsedCORD19XrxivDocument,
                             UnparsedBiorxivDocument,
-                            UnparsedLitCovidCrossrefDocument,
-                            UnparsedLitCovidPubmedXMLDocument,
+                            UnparsedLitCovidDocument,
                             ]
 
 
+def reparse_fields(document, parsed_document, fields):
+    """ Reparses only the given fields of an existing parsed document and saves them,
+    which sends a $set of the changed fields instead of replacing the document."""
+    new_doc = document.parse(fields=fields)
+    for field in fields:
+        parsed_document[field] = new_doc[field]
+    parsed_document._bt = new_doc._bt
+    if any(x in fields for x in document.parser.id_fields):
+        parsed_document.find_missing_ids()
+    parsed_document.save()
+
+
 def parse_document(document):
     try:
         parsed_document = document.parsed_document
     except DoesNotExist:
         parsed_document = None
 
-    fresh_source = document.last_updated > parsed_document._bt
-    new_parser = parsed_document.version < parsed_document.latest_version
+    fresh_source = parsed_document is not None and document.last_updated > parsed_document._bt
+    new_parser = parsed_document is not None and parsed_document.version < parsed_document.latest_version
+
+    if new_parser and not fresh_source:
+        # the source did not change, only reparse what changed in the parser
+        fields = document.parser.changed_fields(parsed_document.version, parsed_document.latest_version)
+        if fields is not None:
+            reparse_fields(document, parsed_document, fields)
+            return
 
     if parsed_document is None or fresh_source or new_parser:
         if parsed_document is None:
@@ -72,20 +104,48 @@ def grouper(n, iterable):
         yield chunk
 
 
-def parse_documents(documents):
+def parse_documents(documents, timings=False):
+    """ Parses a chunk of documents. If timings, returns the parse timings of the chunk
+    as ParseTimings records, to be merged by the caller."""
     init_mongoengine()
-    # print("parsing")
-    for document in documents:
-        parse_document(document)
+    if not timings:
+        # print("parsing")
+        for document in documents:
+            parse_document(document)
+        print('parsed')
+        return None
+
+    # all parsers share the Parser.timings switch, never leave it on for the next chunk
+    Parser.enable_timings()
+    try:
+        for document in documents:
+            parse_document(document)
+    finally:
+        recorded = Parser.disable_timings()
     print('parsed')
+    return recorded.to_records()
 
 
 if __name__ == "__main__":
 
     init_mongoengine()
 
+    # the PHO parser only reads the synopsis paragraphs, lay out the new PDFs first
+    extract_synopses()
+
+    # path of a JSON report of the time spent parsing each field, not recorded if unset
+    timings_path = os.getenv("PARSE_TIMINGS")
+
     with Parallel(n_jobs=32) as parallel:
-        parallel(delayed(parse_documents)(document) for collection in unparsed_collection_list for document in
-                 grouper(500, collection.objects))
+        results = parallel(delayed(parse_documents)(document, timings=timings_path is not None)
+                           for collection in unparsed_collection_list for document in
+                           grouper(500, collection.objects))
+
+    if timings_path is not None:
+        timings = ParseTimings()
+        for records in results:
+            timings.merge(records)
+        timings.dump(timings_path)
+        print(timings.report())
 
     build_entries()
@@ -1,6 +1,7 @@
-import requests
 import warnings
 
+from covidscholar_database.parse.http_client import get_session
+
 ###########################################
 # communicate with crossref
 ###########################################
@@ -19,7 +20,7 @@ def query_crossref_by_doi(doi, verbose=True):
     # query crossref
     query_url = 'https://api.crossref.org/works/{}'.format(doi)
     try:
-        query_results = requests.get(
+        query_results = get_session().get(
             query_url,
         )
     except:
@@ -74,7 +75,7 @@ def query_crossref(query_params):
     # query crossref
     query_url = 'https://api.crossref.org/works'
     try:
-        query_results = requests.get(
+        query_results = get_session().get(
             query_url,
             params=query_params,
         )
@@ -1,5 +1,7 @@
 import json
 import os
+import re
+from collections import namedtuple
 
 # change the default path to scopus config file
 os.environ['PYB_CONFIG_FILE'] = os.path.abspath('scopus_config.ini')
@@ -11,23 +13,31 @@ import pybliometrics
 from pybliometrics.scopus import ScopusSearch
 from pybliometrics.scopus import config as scopus_config
 
+from covidscholar_database.parse.http_client import get_session
+from covidscholar_database.parse.http_transport import get_transport, request_key
+
+SCOPUS_SEARCH_URL = 'https://api.elsevier.com/content/search/scopus'
+
 ###########################################
 # communicate with scopus
 ###########################################
 
-def query_scopus_by_doi(doi, verbose=True):
+def query_scopus_by_doi(doi, verbose=True, search=None):
     """
     get crossref records by paper doi
 
     :param doi: (str) doi of a paper
     :param verbose: (bool) print diagnosis message or not
+    :param search: (callable) ScopusSearch or a stand-in such as a LocalScopusSearch,
+        default from get_scopus_search()
     :return: (dict) result from crossref api
     """
     # goal
     scopus_results = None
+    search = search or get_scopus_search()
 
     # query crossref
-    query_results = ScopusSearch(
+    query_results = search(
         'DOI({})'.format(doi),
         max_entries=None,
         cursor=True
@@ -43,6 +53,139 @@ def query_scopus_by_doi(doi, verbose=True):
 
     return scopus_results
 
+def scopus_doi_batches(dois, max_query_length=2000, max_batch_size=25):
+    """
+    split dois into groups whose OR-joined query stays under the query length limit
+
+    :param dois: (list) of (str) doi
+    :param max_query_length: (int) max number of characters of one query
+    :param max_batch_size: (int) max number of doi in one query, 25 keeps the answer on one page
+    :return: (generator) of (list) of (str) doi
+    """
+    batch = []
+    query_length = 0
+    for doi in dois:
+        clause_length = len('DOI({})'.format(doi))
+        if batch and (len(batch) >= max_batch_size
+                      or query_length + len(' OR ') + clause_length > max_query_length):
+            yield batch
+            batch = []
+            query_length = 0
+        if batch:
+            query_length += len(' OR ')
+        query_length += clause_length
+        batch.append(doi)
+    if batch:
+        yield batch
+
+def query_scopus_by_dois(dois, max_query_length=2000, max_batch_size=25, search=None):
+    """
+    get scopus records of many dois with one 'DOI(a) OR DOI(b) ...' query per batch
+
+    :param dois: (list) of (str) doi of papers
+    :param max_query_length: (int) max number of characters of one query
+    :param max_batch_size: (int) max number of doi in one query
+    :param search: (callable) ScopusSearch or a stand-in such as a LocalScopusSearch,
+        default from get_scopus_search()
+    :return: (dict) doi -> result from scopus api, None when scopus does not know the doi,
+        doi whose query failed are left out
+    """
+    search = search or get_scopus_search()
+    all_results = {}
+    for batch in scopus_doi_batches(dois, max_query_length, max_batch_size):
+        query = ' OR '.join('DOI({})'.format(doi) for doi in batch)
+        try:
+            query_results = search(query, max_entries=None, cursor=True)
+        except Exception as e:
+            # one malformed doi fails the whole query, retry the batch doi by doi
+            print('Error!', type(e), e)
+            for doi in batch:
+                try:
+                    all_results[doi] = query_scopus_by_doi(doi, search=search)
+                except Exception as e:
+                    print('Error!', doi, type(e), e)
+            continue
+
+        found = {}
+        for result in query_results.results or []:
+            if result.doi and result.doi.lower() not in found:
+                found[result.doi.lower()] = result._asdict()
+        for doi in batch:
+            all_results[doi] = found.get(doi.lower())
+    return all_results
+
+# what a LocalScopusSearch query returns, like the .results of a ScopusSearch
+LocalScopusResults = namedtuple('LocalScopusResults', ['results'])
+
+class LocalScopusSearch(object):
+    """
+    stand-in for ScopusSearch answering DOI(x) queries from a local list of
+    records, to run the scopus scripts without network or quota. Called like
+    ScopusSearch, each instance keeps its own records and the queries it answered.
+
+    search = LocalScopusSearch([{'doi': '10.1/a', 'eid': '2-s2.0-1', ...}, ...])
+    query_scopus_by_dois(dois, search=search)
+    """
+
+    def __init__(self, records=None):
+        """
+        :param records: (list) of (dict) scopus records, each with a 'doi'
+        """
+        self.records = list(records or [])
+        self.queries = []
+
+    def __call__(self, query, max_entries=None, cursor=True):
+        self.queries.append(query)
+        wanted = set(d.lower() for d in re.findall(r'DOI\((.+?)\)(?= OR |$)', query))
+        fields = sorted(set(k for r in self.records for k in r) | {'doi'})
+        Document = namedtuple('Document', fields)
+        results = [
+            Document(**{k: r.get(k) for k in fields})
+            for r in self.records
+            if r.get('doi') and r['doi'].lower() in wanted
+        ] or None
+        return LocalScopusResults(results)
+
+class ArchivedScopusSearch(object):
+    """
+    ScopusSearch following the HTTP transport of parse/http_transport.py
+
+    pybliometrics sends its own requests, so the archive keeps the results of each
+    query, under the key of a GET of SCOPUS_SEARCH_URL?query=...: in record mode
+    ScopusSearch runs and its results are stored, in replay and standin mode they
+    are read back through the shared session (404 means no result).
+    """
+
+    def __init__(self, query, max_entries=None, cursor=True):
+        config = get_transport()
+        url = requests.Request('GET', SCOPUS_SEARCH_URL, params={'query': query}).prepare().url
+        if config['mode'] == 'record':
+            self.results = ScopusSearch(query, max_entries=max_entries, cursor=cursor).results
+            records = [r._asdict() for r in self.results] if self.results is not None else None
+            config['archive'].put(
+                request_key('GET', url), 200 if records else 404,
+                {'Content-Type': 'application/json'}, json.dumps(records).encode('utf-8')
+            )
+            return
+
+        response = get_session().get(url)
+        if response.status_code == 404:
+            self.results = None
+            return
+        response.raise_for_status()
+        records = response.json()
+        fields = sorted(set(k for r in records for k in r))
+        Document = namedtuple('Document', fields)
+        self.results = [Document(**{k: r.get(k) for k in fields}) for r in records] or None
+
+def get_scopus_search():
+    """
+    :return: (class) ScopusSearch, or ArchivedScopusSearch when the HTTP transport records or replays
+    """
+    if get_transport()['mode'] == 'live':
+        return ScopusSearch
+    return ArchivedScopusSearch
+
 def change_default_scopus_config(api_key, cache_dir=None):
     # scopus_config.set()
     if not cache_dir:
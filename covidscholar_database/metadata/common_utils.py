@@ -2,10 +2,26 @@ import json
 from pprint import pprint
 import pymongo
 import regex
-from datetime import datetime
 import requests
 import warnings
 import os
+import sys
+
+# the parsers import dates, authors and doi_key flat from the parse folder: import
+# the same modules, so that their caches are shared instead of duplicated under the
+# covidscholar_database.parse names
+parser_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../parse'
+    )
+)
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
+from dates import parse_date_str
+from doi_key import canonical_doi
+from authors import parse_names_str, parse_names_list
 
 ###########################################
 # communicate with mongodb
@@ -60,54 +76,23 @@ def get_mongo_db(config_file_path=None, mongo_config=None):
     return db
 
 ###########################################
-# parse web data
+# doi
 ###########################################
-PATTERN_DATE_0 =[
-    '%m/%d/%Y',
-    '%Y-%m-%d',
-    '%Y',
-    '%Y %b %d',
-    '%Y %b',
-]
 
-MONTH_DICT = {
-    'jan': 1,
-    'feb': 2,
-    'mar': 3,
-    'apr': 4,
-    'may': 5,
-    'jun': 6,
-    'jul': 7,
-    'aug': 8,
-    'sep': 9,
-    'oct': 10,
-    'nov': 11,
-    'dec': 12,
-}
-SEASON_DICT = {
-    'spring': 1,
-    'summer': 4,
-    'autumn': 7,
-    'fall': 7,
-    'winter': 10,
-}
+def doi_url_rm_prefix(doi_url):
+    doi = doi_url
+    tmp_m = regex.match(r'.*doi.org/(.*)', doi_url)
+    if tmp_m:
+        doi = tmp_m.group(1).strip()
+    return doi
 
-PATTERN_DATE_1 = [
-    regex.compile(
-        '(?P<year>[0-9]{{4}}) +(?P<month>{}).*'.format(
-            '|'.join(list(MONTH_DICT.keys()))
-        )
-    ),
-    regex.compile(
-        '(?P<year>[0-9]{{4}}) +(?P<season>{}).*'.format(
-            '|'.join(list(SEASON_DICT.keys()))
-        )
-    ),
-    regex.compile(
-        '.*(?P<year>[0-9]{4})-(?P<month>[0-9]{1,2})-(?P<day>[0-9]{1,2}).*'
-    ),
-]
+def normalize_doi(doi):
+    """ Key used to compare DOIs from different sources, see parse/doi_key.py"""
+    return canonical_doi(doi_url_rm_prefix(doi))
 
+###########################################
+# parse web data
+###########################################
 def parse_date(date_obj):
     date = {}
     if isinstance(date_obj, str):
@@ -140,40 +125,6 @@ def parse_date_list(date_list):
         }
     return time_parsed
 
-def parse_date_str(date_str):
-    time_parsed = {}
-    date_str = date_str.strip()
-    for a_pattern in PATTERN_DATE_0:
-        try:
-            result = datetime.strptime(date_str, a_pattern)
-            if '%Y' in a_pattern:
-                time_parsed['year'] = result.year
-            if '%m' in a_pattern or '%b' in a_pattern:
-                time_parsed['month'] = result.month
-            if '%d' in a_pattern:
-                time_parsed['day'] = result.day
-            break
-        except:
-            pass
-    if len(time_parsed) == 0:
-        for a_pattern in PATTERN_DATE_1:
-            tmp_m = a_pattern.match(date_str.lower())
-            if tmp_m:
-                result = tmp_m.groupdict()
-                if 'year' in result:
-                    time_parsed['year'] = int(result['year'])
-                if 'month' in result:
-                    if result['month'] in MONTH_DICT:
-                        time_parsed['month'] = int(MONTH_DICT[result['month']])
-                    else:
-                        time_parsed['month'] = int(result['month'])
-                if 'season' in result:
-                    time_parsed['month'] = int(SEASON_DICT[result['season']])
-                if 'day' in result:
-                    time_parsed['day'] = int(result['day'])
-                break
-    return time_parsed
-
 def parse_names(name_obj):
     names = []
     if isinstance(name_obj, str):
@@ -181,50 +132,3 @@ def parse_names(name_obj):
     if isinstance(name_obj, list):
         names = parse_names_list(name_obj)
     return names
-
-def parse_names_str(name_str):
-    names = []
-    fragments = []
-    name_str = name_str.strip()
-
-    if ';' in name_str:
-        fragments = name_str.split(';')
-    elif (name_str.count(',') > 1
-         or (name_str.count(',')==1 and name_str.count(' ')>2)
-    ):
-        fragments = name_str.split(',')
-    elif (name_str.count(',')==1 and name_str.count(' ')<=2):
-        fragments = [name_str]
-    elif ' ' in name_str:
-        fragments = [name_str]
-    for frag in fragments:
-        tmp_name = None
-        if ',' in frag:
-            pieces = frag.split(',')
-            tmp_name = {
-                'last': pieces[0].strip(),
-                'first': pieces[-1].strip(),
-            }
-        elif ' ' in frag:
-            pieces = frag.split(' ')
-            tmp_name = {
-                'last': pieces[-1].strip(),
-                'first': pieces[0].strip(),
-            }
-        else:
-            tmp_name = {
-                'first': frag.strip(),
-                'last': None
-            }
-        if tmp_name is not None:
-            names.append(tmp_name)
-    return names
-
-def parse_names_list(name_list):
-    names = []
-    for n in name_list:
-        names.append({
-            'first': n.get('given', None),
-            'last': n.get('family', None),
-        })
-    return names
\ No newline at end of file
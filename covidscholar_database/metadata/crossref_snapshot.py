@@ -0,0 +1,178 @@
+import os
+import sys
+
+parent_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../..'
+    )
+)
+if parent_folder not in sys.path:
+    sys.path.append(parent_folder)
+
+import argparse
+import glob
+import gzip
+import json
+import sqlite3
+import threading
+
+from covidscholar_database.metadata.common_utils import normalize_doi
+
+###########################################
+# local index of a crossref snapshot
+###########################################
+
+# fields of a crossref work used by CrossrefParser, everything else is dropped
+CROSSREF_FIELDS = [
+    'DOI',
+    'title',
+    'author',
+    'container-title',
+    'short-container-title',
+    'ISSN',
+    'abstract',
+    'issued',
+    'published-online',
+    'published-print',
+    'reference',
+]
+
+
+def trim_crossref_record(record):
+    """
+    keep only what CrossrefParser reads from a crossref work
+
+    :param record: (dict) crossref work, as in the 'message' of api.crossref.org/works/{doi}
+    :return: (dict) the same work with the unused fields removed
+    """
+    trimmed = {k: record[k] for k in CROSSREF_FIELDS if k in record}
+    if isinstance(trimmed.get('reference'), list):
+        trimmed['reference'] = [
+            {'DOI': ref['DOI']}
+            for ref in trimmed['reference']
+            if isinstance(ref, dict) and ref.get('DOI')
+        ]
+    return trimmed
+
+
+def iter_snapshot_records(paths):
+    """
+    stream the works of crossref snapshot files
+
+    :param paths: (list) of (str) gzipped JSON lines files, or folders of them.
+        A line is either one work or an object with a list of works in 'items'.
+    :return: (generator) of (dict) crossref work
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                glob.glob(os.path.join(path, '**', '*.gz'), recursive=True)
+            )
+        else:
+            files = [path]
+        for file_path in files:
+            with gzip.open(file_path, 'rt', encoding='utf-8') as fr:
+                for line in fr:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    if isinstance(record.get('items'), list):
+                        yield from record['items']
+                    else:
+                        yield record
+
+
+class CrossrefSnapshot(object):
+    """
+    Crossref works indexed by normalized doi in a SQLite file, to resolve most
+    dois locally instead of calling api.crossref.org.
+
+    Each thread gets its own read-only connection, so a snapshot can be shared
+    by the concurrent metadata providers of get_metadata.
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: (str) path to the SQLite file written by ingest_crossref_snapshot
+        """
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def _connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = sqlite3.connect(
+                'file:{}?mode=ro'.format(self.db_path),
+                uri=True,
+            )
+        return self.local.connection
+
+    def get(self, doi):
+        """
+        :param doi: (str) doi of a paper, with or without doi.org prefix
+        :return: (dict or None) trimmed crossref work, None if not in the snapshot
+        """
+        row = self._connection().execute(
+            'SELECT record FROM works WHERE doi = ?',
+            (normalize_doi(doi),)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+
+def ingest_crossref_snapshot(paths, db_path, batch_size=10000):
+    """
+    index crossref snapshot files into a SQLite file. Works already in the
+    index are replaced, so a newer snapshot can be ingested on top of an old one.
+
+    :param paths: (list) of (str) snapshot files or folders, see iter_snapshot_records
+    :param db_path: (str) path to the SQLite file
+    :param batch_size: (int) number of works written per transaction
+    :return: (int) number of works indexed
+    """
+    connection = sqlite3.connect(db_path)
+    # the index can be rebuilt from the snapshot, durability is not needed
+    connection.execute('PRAGMA journal_mode = OFF')
+    connection.execute('PRAGMA synchronous = OFF')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS works (doi TEXT PRIMARY KEY, record TEXT NOT NULL) WITHOUT ROWID'
+    )
+
+    num_works = 0
+    batch = []
+    for record in iter_snapshot_records(paths):
+        if not isinstance(record.get('DOI'), str) or not record['DOI']:
+            continue
+        batch.append((
+            normalize_doi(record['DOI']),
+            json.dumps(trim_crossref_record(record), separators=(',', ':')),
+        ))
+        if len(batch) >= batch_size:
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO works VALUES (?, ?)', batch)
+            num_works += len(batch)
+            batch = []
+            print('indexed works:', num_works)
+    if batch:
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO works VALUES (?, ?)', batch)
+        num_works += len(batch)
+    connection.close()
+    return num_works
+
+
+if __name__ == '__main__':
+
+    """
+    Index a crossref snapshot, then point get_metadata to it with the environment variable
+        CROSSREF_SNAPSHOT_DB: path/to/crossref_snapshot.sqlite
+    """
+
+    arg_parser = argparse.ArgumentParser(description='Index a crossref snapshot into SQLite')
+    arg_parser.add_argument('paths', nargs='+', help='gzipped JSON lines files or folders of them')
+    arg_parser.add_argument('--db', default='crossref_snapshot.sqlite', help='SQLite file to write')
+    args = arg_parser.parse_args()
+
+    print('total indexed:', ingest_crossref_snapshot(args.paths, args.db))
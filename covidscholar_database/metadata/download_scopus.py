@@ -14,96 +14,118 @@ if parent_folder not in sys.path:
 
 import json
 from pprint import pprint
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import socket
 
 from covidscholar_database.metadata.common_utils import get_mongo_db
-from covidscholar_database.metadata.api_scopus import query_scopus_by_doi
+from covidscholar_database.metadata.api_scopus import query_scopus_by_dois
 from covidscholar_database.metadata.api_scopus import change_default_scopus_config
 
+# seconds a claimed doi stays reserved to one harvester
+LEASE_SECONDS = 3600
 
-def collect_scopus_data(mongo_db):
-    aug_col = mongo_db['metadata_from_api']
+def scopus_queue_filter(now=None):
+    """
+    filter of metadata_from_api records still waiting for scopus
 
-    all_doi = aug_col.find(
-        {
-            '$or': [
-                {
-                    'doi': {'$exists': True},
-                    'scopus_raw_result': {'$exists': False},
-                    'scopus_tried': {'$exists': False},
-                },
-                {
-                    'doi': {'$exists': True},
-                    'scopus_raw_result': {'$exists': False},
-                    'scopus_tried': False,
+    :param now: (datetime or None) if given, also skip records leased by a running harvester
+    :return: (dict) mongo filter
+    """
+    queue_filter = {
+        'doi': {'$exists': True},
+        'scopus_tried': {'$ne': True},
+        'scopus_raw_result': {'$exists': False},
+    }
+    if now is not None:
+        queue_filter['$or'] = [
+            {'lease_until': {'$exists': False}},
+            {'lease_until': {'$lt': now}},
+        ]
+    return queue_filter
+
+def claim_scopus_block(aug_col, block_size, lease_seconds=LEASE_SECONDS, worker_id=None, exclude_ids=None):
+    """
+    lease up to block_size records to this harvester, in three queries: read a block
+    of candidate _id, lease them with one update_many guarded by the queue filter,
+    then read back the ones this harvester got. The guard is checked atomically per
+    record, so harvesters running in parallel never get the same doi, and a lease
+    left by a crashed harvester expires after lease_seconds.
+
+    :param aug_col: (object) the metadata_from_api collection
+    :param block_size: (int) max number of records to claim
+    :param lease_seconds: (int) how long the records are reserved
+    :param worker_id: (str or None) name of the harvester holding the lease
+    :param exclude_ids: (set or None) _id not to claim, e.g. the ones that failed in this run
+    :return: (list) of (dict) claimed records with _id and doi
+    """
+    worker_id = worker_id or '{}-{}'.format(socket.gethostname(), os.getpid())
+    while True:
+        now = datetime.now()
+        queue_filter = scopus_queue_filter(now)
+        if exclude_ids:
+            queue_filter['_id'] = {'$nin': list(exclude_ids)}
+        candidates = [doc['_id'] for doc in aug_col.find(queue_filter, {'_id': True}).limit(block_size)]
+        if not candidates:
+            return []
+
+        # mongo keeps milliseconds, the claimed records are read back by this exact value
+        lease_until = now + timedelta(seconds=lease_seconds)
+        lease_until = lease_until.replace(microsecond=lease_until.microsecond // 1000 * 1000)
+        claim_filter = scopus_queue_filter(now)
+        claim_filter['_id'] = {'$in': candidates}
+        aug_col.update_many(
+            claim_filter,
+            {
+                '$set': {
+                    'lease_until': lease_until,
+                    'lease_owner': worker_id,
                 }
-            ]
-        },
-        {
-            '_id': True,
-            'doi': True,
-        }
-    )
-    print('total_num:', all_doi.count())
+            }
+        )
+        block = list(aug_col.find(
+            {'_id': {'$in': candidates}, 'lease_owner': worker_id, 'lease_until': lease_until},
+            {'_id': True, 'doi': True}
+        ))
+        # else every candidate was claimed by another harvester in between, try the next ones
+        if block:
+            return block
+
+def collect_scopus_data(mongo_db, num_blocks=50, block_size=1000, lease_seconds=LEASE_SECONDS):
+    aug_col = mongo_db['metadata_from_api']
+    aug_col.create_index([('scopus_tried', 1), ('lease_until', 1)])
 
-    num_blocks = 50
-    block_size = 100
+    print('total_num:', aug_col.count_documents(scopus_queue_filter()))
+
+    # released for the other harvesters, but not retried by this one
+    failed_ids = set()
     for i in range(num_blocks):
         print('block index: {} out of {}'.format(i, num_blocks))
         # get tasks as a block
-        block = aug_col.aggregate(
-            [
-                {
-                    '$match': {
-                        '$or': [
-                            {
-                                'doi': {'$exists': True},
-                                'scopus_raw_result': {'$exists': False},
-                                'scopus_tried': {'$exists': False},
-                            },
-                            {
-                                'doi': {'$exists': True},
-                                'scopus_raw_result': {'$exists': False},
-                                'scopus_tried': False,
-                            }
-                        ]
-                    }
-                },
-                {
-                    '$sample': {'size': block_size}
-                },
-                {
-                    '$project': {'_id': True, 'doi': True,}
-                },
-            ],
-            allowDiskUse=True
-        )
+        block = claim_scopus_block(aug_col, block_size, lease_seconds, exclude_ids=failed_ids)
+        if not block:
+            break
 
-        # download from scopus
+        # download from scopus, many doi per query
+        query_results = query_scopus_by_dois([doc['doi'] for doc in block])
         for doc in block:
-            print(doc)
-            set_params = {
-                'last_updated': datetime.now(),
-                'scopus_tried': True
+            update = {
+                '$set': {
+                    'last_updated': datetime.now(),
+                    'scopus_tried': doc['doi'] in query_results
+                },
+                '$unset': {'lease_until': '', 'lease_owner': ''},
             }
-
-            try:
-                query_result = query_scopus_by_doi(doc['doi'])
-            except Exception as e:
-                query_result = None
-                set_params['scopus_tried'] = False
-                print('Error!', type(e), e)
+            query_result = query_results.get(doc['doi'])
             if query_result is not None:
-                set_params['scopus_raw_result'] = query_result
+                update['$set']['scopus_raw_result'] = query_result
+            if doc['doi'] not in query_results:
+                failed_ids.add(doc['_id'])
             aug_col.find_one_and_update(
                 {'_id': doc['_id']},
-                {
-                    '$set': set_params
-                }
+                update
             )
 
-
 if __name__ == '__main__':
 
     """
@@ -120,7 +142,9 @@ if __name__ == '__main__':
         COVID_PASS: xx-your-password-xx
         COVID_DB: COVID-19-text-mining
     
-    3. Run this script once a week. It will try to download data from scopus for 50 blocks * 100 doi/block.
+    3. Run this script once a week. It will try to download data from scopus for 50 blocks * 1000 doi/block,
+    packing up to 25 doi in one scopus query. Several copies of the script can run at the same time,
+    each block of doi is leased to one of them.
     
     """
 
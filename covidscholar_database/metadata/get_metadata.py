@@ -14,9 +14,14 @@ parser_folder = os.path.join(parent_folder, 'parse')
 if parser_folder not in sys.path:
     sys.path.append(parser_folder)
 
+import collections
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pprint import pprint
 from covidscholar_database.metadata.api_crossref import query_crossref_by_doi
+from covidscholar_database.metadata.crossref_snapshot import CrossrefSnapshot
+from covidscholar_database.metadata.common_utils import normalize_doi
 from covidscholar_database.metadata.api_scopus import query_scopus_by_doi
 from covidscholar_database.metadata.api_scopus import change_default_scopus_config
 from covidscholar_database.metadata.parser_crossref import CrossrefParser
@@ -25,19 +30,40 @@ from covidscholar_database.metadata.metadata_doc import MetadataDocument
 
 crossref_parser = CrossrefParser()
 scopus_parser = ScopusParser()
+crossref_snapshot = None
 
 ####################################################
 # use api
 ####################################################
 
+def get_crossref_snapshot():
+    """
+    :return: (object or None) CrossrefSnapshot at $CROSSREF_SNAPSHOT_DB, None if not set
+    """
+    global crossref_snapshot
+    if crossref_snapshot is None:
+        db_path = os.getenv('CROSSREF_SNAPSHOT_DB')
+        if db_path and os.path.exists(db_path):
+            crossref_snapshot = CrossrefSnapshot(db_path)
+    return crossref_snapshot
+
 def get_api_crossref_metadata_by_doi(doi):
     result = None
+    query_result = None
+    # local crossref snapshot
+    snapshot = get_crossref_snapshot()
+    if snapshot is not None:
+        try:
+            query_result = snapshot.get(doi)
+        except Exception as e:
+            print(e)
     # crossref api
-    try:
-        query_result = query_crossref_by_doi(doi)
-    except Exception as e:
-        query_result = None
-        print(e)
+    if query_result is None:
+        try:
+            query_result = query_crossref_by_doi(doi)
+        except Exception as e:
+            query_result = None
+            print(e)
     if query_result is not None:
         result = crossref_parser.get_parsed_doc(query_result)
     return result
@@ -54,26 +80,117 @@ def get_api_scopus_metadata_by_doi(doi):
         result = scopus_parser.get_parsed_doc(query_result)
     return result
 
-def get_api_metadata_by_doi(doi):
+# name -> provider of get_api_metadata_by_doi, merged in this order
+metadata_providers = collections.OrderedDict()
+
+def register_metadata_provider(name, func, timeout=10.0, hedge_after=None):
+    """
+    add an API to query in get_api_metadata_by_doi. All providers are queried
+    at the same time, so a new provider does not add to the latency.
+
+    :param name: (str) name of the provider, registering it again replaces it
+    :param func: (function) doi -> parsed metadata (dict or None)
+    :param timeout: (float) seconds after which the answer of this provider is ignored
+    :param hedge_after: (float or None) seconds after which a second identical query
+        is sent if the first one has not answered, None to never send it
+    """
+    metadata_providers[name] = {
+        'func': func,
+        'timeout': timeout,
+        'hedge_after': hedge_after,
+    }
+
+register_metadata_provider('crossref', get_api_crossref_metadata_by_doi, timeout=10.0, hedge_after=3.0)
+# scopus queries count against the weekly quota, do not hedge them
+register_metadata_provider('scopus', get_api_scopus_metadata_by_doi, timeout=20.0)
+
+def query_metadata_providers(doi, deadline=None):
+    """
+    query all the registered providers concurrently
+
+    :param doi: (str) doi of paper
+    :param deadline: (float or None) seconds to wait for all the providers at most
+    :return: (dict) provider name -> parsed metadata, only for providers that
+        answered in time with a result
+    """
+    # each lookup has its own pool, one worker per possible attempt: queries abandoned
+    # at a timeout or after losing a hedge run out in it instead of taking the workers
+    # of later lookups
+    executor = ThreadPoolExecutor(max_workers=2 * len(metadata_providers) or 1)
+    start = time.monotonic()
+
+    attempts = {}
+    for name, provider in metadata_providers.items():
+        attempts[executor.submit(provider['func'], doi)] = name
+    pending = set(metadata_providers)
+    hedged = set()
+    results = {}
+
+    while pending:
+        elapsed = time.monotonic() - start
+        # drop the providers out of time
+        for name in list(pending):
+            timeout = metadata_providers[name]['timeout']
+            if (timeout is not None and elapsed >= timeout) or (deadline is not None and elapsed >= deadline):
+                pending.discard(name)
+        # send the hedged queries that are due
+        for name in pending - hedged:
+            hedge_after = metadata_providers[name]['hedge_after']
+            if hedge_after is not None and elapsed >= hedge_after:
+                attempts[executor.submit(metadata_providers[name]['func'], doi)] = name
+                hedged.add(name)
+        if not pending:
+            break
+
+        # sleep until the next answer, timeout or hedge
+        events = [deadline]
+        for name in pending:
+            events.append(metadata_providers[name]['timeout'])
+            if name not in hedged:
+                events.append(metadata_providers[name]['hedge_after'])
+        events = [t for t in events if t is not None]
+        wait_time = max(0.0, min(events) - elapsed) if events else None
+        running = [f for f, name in attempts.items() if name in pending]
+        done, _ = wait(running, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name = attempts.pop(future)
+            if name not in pending:
+                continue
+            try:
+                r = future.result()
+            except Exception as e:
+                print(name, e)
+                # the hedged query may still answer
+                if any(n == name for n in attempts.values()):
+                    continue
+                r = None
+            pending.discard(name)
+            if r:
+                results[name] = r
+
+    # drop the queries not started yet, the running ones finish in the background
+    for future in attempts:
+        future.cancel()
+    executor.shutdown(wait=False)
+
+    return results
+
+def get_api_metadata_by_doi(doi, deadline=None):
     """
     get metadata of a paper by it doi.
-    Query all the APIs such as crossref, scopes, etc.
+    Query all the APIs such as crossref, scopes, etc. at the same time.
     If not found, return None.
 
     :param doi: (str) doi of paper
+    :param deadline: (float or None) seconds to wait for the APIs at most,
+        by default each API is given its own timeout
     :return: (dict or None) metadata of the paper such as title, authors, etc.
     """
     result = None
 
-    docs = []
-    funcs = {
-        'crossref': get_api_crossref_metadata_by_doi,
-        'scopus': get_api_scopus_metadata_by_doi,
-    }
-    for k, f in funcs.items():
-        r = f(doi)
-        if r:
-            docs.append(r)
+    results = query_metadata_providers(doi, deadline=deadline)
+    docs = [results[k] for k in metadata_providers if k in results]
     if len(docs) > 0:
         result = MetadataDocument.merge_docs(docs)
 
@@ -138,6 +255,79 @@ def get_db_metadata_by_doi(mongo_db, doi):
 
     return result
 
+def get_db_metadata_by_dois(mongo_db, dois, chunk_size=1000):
+    """
+    get metadata of many papers by their dois.
+    Query existing metadata in COVID database with one $in query per chunk of
+    dois instead of two find_one per doi.
+
+    :param mongo_db: (object) a mongo_db object to fetch data from COVID database
+    :param dois: (list) of (str) doi of papers
+    :param chunk_size: (int) max number of doi in one query
+    :return: (dict) doi -> (dict) metadata of the paper, dois not found are left out
+    """
+    col_name = 'metadata_from_api'
+    col = mongo_db[col_name]
+
+    # records are matched by doi_key, so formatting differences of the dois do not matter
+    dois = list(dict.fromkeys(dois))
+    keys = {}
+    for doi in dois:
+        keys.setdefault(normalize_doi(doi), []).append(doi)
+    keys.pop(None, None)
+    key_list = list(keys)
+
+    raw_results = {}
+    for i in range(0, len(key_list), chunk_size):
+        chunk = key_list[i: i+chunk_size]
+        query = col.find(
+            {
+                '$and': [
+                    {
+                        '$or': [
+                            {'doi_key': {'$in': chunk}},
+                            # records written before doi_key existed
+                            {'doi': {'$in': chunk + [doi for key in chunk for doi in keys[key]]}},
+                        ]
+                    },
+                    {
+                        '$or': [
+                            {'crossref_raw_result': {'$exists': True}},
+                            {'scopus_raw_result': {'$exists': True}},
+                        ]
+                    },
+                ]
+            },
+            {
+                '_id': False,
+                'doi': True,
+                'crossref_raw_result': True,
+                'scopus_raw_result': True,
+            }
+        )
+        for doc in query:
+            # keep the first record of each source, like find_one
+            raw = raw_results.setdefault(normalize_doi(doc['doi']), {})
+            for k in ['crossref_raw_result', 'scopus_raw_result']:
+                if k in doc and k not in raw:
+                    raw[k] = doc[k]
+
+    # parse each source in batch, so the ids of post-processing are resolved at once
+    parsed = {}
+    for k, parser in [('crossref_raw_result', crossref_parser), ('scopus_raw_result', scopus_parser)]:
+        keys_k = [key for key, raw in raw_results.items() if k in raw]
+        docs_k = parser.get_parsed_docs([raw_results[key][k] for key in keys_k])
+        for key, doc in zip(keys_k, docs_k):
+            parsed.setdefault(key, []).append(doc)
+
+    results = {}
+    for key, docs in parsed.items():
+        docs = [r for r in docs if r]
+        if len(docs) > 0 and key in keys:
+            for doi in keys[key]:
+                results[doi] = MetadataDocument.merge_docs(docs)
+    return results
+
 
 ####################################################
 # entrance to all
@@ -165,6 +355,25 @@ def get_metadata_by_doi(mongo_db, doi):
 
     return result
 
+def get_metadata_by_dois(mongo_db, dois, use_api=True):
+    """
+    get metadata of many papers by their dois.
+    First query existing metadata in COVID database in batch.
+    Only the dois not found there are queried from the APIs.
+
+    :param mongo_db: (object) a mongo_db object to fetch data from COVID database
+    :param dois: (list) of (str) doi of papers
+    :param use_api: (bool) query the APIs for dois missing in the database
+    :return: (dict) doi -> (dict or None) metadata of the paper such as title, authors, etc.
+    """
+    results = get_db_metadata_by_dois(mongo_db, dois)
+
+    for doi in dois:
+        if doi not in results:
+            results[doi] = get_api_metadata_by_doi(doi) if use_api else None
+
+    return results
+
 
 if __name__ == '__main__':
     from covidscholar_database.metadata.common_utils import get_mongo_db
@@ -0,0 +1,209 @@
+import os
+import sys
+
+parent_folder = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        '../..'
+    )
+)
+if parent_folder not in sys.path:
+    sys.path.append(parent_folder)
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from urllib3.util.retry import Retry
+
+from covidscholar_database.metadata.common_utils import get_mongo_db
+from covidscholar_database.parse.http_client import new_session
+from covidscholar_database.metadata.common_utils import normalize_doi
+from covidscholar_database.metadata.scrape_metadata_by_api import plan_missing_dois
+
+###########################################
+# concurrent crossref harvesting
+###########################################
+
+CROSSREF_WORKS_URL = 'https://api.crossref.org/works/{}'
+
+
+class RateLimiter(object):
+    """
+    Spaces out request starts across threads. The rate follows the
+    X-Rate-Limit-Limit / X-Rate-Limit-Interval headers crossref sends back,
+    and a 429 pushes every thread back.
+    """
+
+    def __init__(self, requests_per_second=10.0):
+        self.interval = 1.0 / requests_per_second
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def update_from_headers(self, headers):
+        """
+        :param headers: (dict) response headers, e.g.
+            {'X-Rate-Limit-Limit': '50', 'X-Rate-Limit-Interval': '1s'}
+        """
+        try:
+            limit = int(headers['X-Rate-Limit-Limit'])
+            interval = float(headers['X-Rate-Limit-Interval'].rstrip('s'))
+        except (KeyError, ValueError):
+            return
+        if limit > 0:
+            self.interval = interval / limit
+
+    def backoff(self, seconds):
+        with self.lock:
+            self.next_time = max(self.next_time, time.monotonic() + seconds)
+
+
+class CrossrefHarvester(object):
+    """
+    Downloads crossref records for many DOIs with a bounded number of concurrent
+    requests, in crossref's polite pool (mailto in both the User-Agent and the
+    query), and stores them in metadata_from_api as they arrive.
+
+    Every DOI is saved as soon as its request completes, with crossref_tried set
+    like scopus_tried in download_scopus, so an interrupted harvest resumes from
+    where it stopped once plan_missing_dois is run again.
+    """
+
+    def __init__(self, aug_col, mailto=None, max_workers=8, max_retries=5):
+        """
+        :param aug_col: (object) the metadata_from_api collection
+        :param mailto: (str or None) contact email for the polite pool, defaults to $CROSSREF_MAILTO
+        :param max_workers: (int) number of concurrent requests
+        :param max_retries: (int) retries of a DOI after 429 responses
+        """
+        self.aug_col = aug_col
+        self.mailto = mailto or os.getenv('CROSSREF_MAILTO')
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter()
+
+        user_agent = 'COVIDScholar/1.0 (https://covidscholar.org'
+        if self.mailto:
+            user_agent += '; mailto:{}'.format(self.mailto)
+        # 429 are left to the rate limiter
+        self.session = new_session(
+            pool_sizes={'api.crossref.org': max_workers},
+            retries=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504]),
+            headers={'User-Agent': user_agent + ')'},
+        )
+
+    def query(self, doi):
+        """
+        :param doi: (str) doi of a paper
+        :return: (dict or None) crossref record, None if crossref does not know the doi
+        """
+        params = {'mailto': self.mailto} if self.mailto else None
+        for _ in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            response = self.session.get(CROSSREF_WORKS_URL.format(doi), params=params, timeout=30)
+            self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code == 429:
+                self.rate_limiter.backoff(float(response.headers.get('Retry-After', 10)))
+                continue
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            message = response.json().get('message')
+            return message if isinstance(message, dict) else None
+        raise ConnectionError('Crossref kept rate limiting when searching doi: {}!'.format(doi))
+
+    def _save(self, doi, future):
+        set_params = {
+            'doi': doi,
+            'doi_key': normalize_doi(doi),
+            'last_updated': datetime.now(),
+            'crossref_tried': True,
+        }
+        try:
+            query_result = future.result()
+        except Exception as e:
+            query_result = None
+            set_params['crossref_tried'] = False
+            print('Error!', doi, type(e), e)
+        if query_result is not None:
+            set_params['crossref_raw_result'] = query_result
+        self.aug_col.update_one({'doi': doi}, {'$set': set_params}, upsert=True)
+
+    def harvest(self, dois):
+        """
+        :param dois: (iterable) of (str) doi to download, consumed lazily
+        :return: (int) number of dois processed
+        """
+        num_done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+            for doi in dois:
+                if len(in_flight) >= 2 * self.max_workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._save(in_flight.pop(future), future)
+                        num_done += 1
+                        if num_done % 1000 == 0:
+                            print('harvested from crossref: {}'.format(num_done))
+                in_flight[executor.submit(self.query, doi)] = doi
+            for future in list(in_flight):
+                self._save(in_flight.pop(future), future)
+                num_done += 1
+        return num_done
+
+
+def harvest_crossref_data(mongo_db, mailto=None, max_workers=8):
+    """
+    Concurrent replacement of scrape_metadata_by_api.collect_crossref_data.
+
+    :param mongo_db: (object) a mongo_db object of the COVID database
+    :param mailto: (str or None) contact email for crossref's polite pool
+    :param max_workers: (int) number of concurrent requests
+    """
+    aug_col = mongo_db['metadata_from_api']
+    aug_col.create_index('doi', unique=False)
+    aug_col.create_index('doi_key', unique=False)
+
+    todo = plan_missing_dois(
+        mongo_db,
+        {
+            '$or': [
+                {'crossref_raw_result': {'$exists': True}},
+                {'crossref_tried': True},
+            ]
+        }
+    )
+
+    harvester = CrossrefHarvester(aug_col, mailto=mailto, max_workers=max_workers)
+    print('newly harvested:', harvester.harvest(todo))
+
+
+if __name__ == '__main__':
+
+    """
+    Add following environment variables
+        CROSSREF_MAILTO: xx-contact-email-for-crossref-xx
+        COVID_HOST: mongodb05.nersc.gov
+        COVID_USER: xx-your-username-xx
+        COVID_PASS: xx-your-password-xx
+        COVID_DB: COVID-19-text-mining
+
+    The script can be stopped and restarted at any time, dois already processed are skipped.
+    """
+
+    db = get_mongo_db(mongo_config={
+        'host': os.getenv("COVID_HOST"),
+        'username': os.getenv("COVID_USER"),
+        'password': os.getenv("COVID_PASS"),
+        'db_name': os.getenv("COVID_DB"),
+    })
+    harvest_crossref_data(db)
@@ -0,0 +1,119 @@
+from datetime import datetime
+import collections
+
+from covidscholar_database.metadata.metadata_doc import MetadataDocument
+from covidscholar_database.parse.utils import find_remaining_ids_batch
+from covidscholar_database.parse.base import Parser
+
+class ApiParser(Parser):
+    """
+    Common base of the parsers for results of metadata APIs (crossref, scopus)
+
+    Post-process functions may need the same expensive value, e.g. pmcid and
+    pubmed_id both come from one idconv lookup. Such a value is declared once in
+    post_dependencies, resolved before the post-process functions run, for all
+    the documents of a batch at once, and read from parsed_doc[name] like
+    _publish_date. The names start with '_' and are removed from the result.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parse_functions = {}
+        self.post_functions = collections.OrderedDict()
+
+        # name -> function(list of parsed docs) -> list of values, one per doc
+        self.post_dependencies = collections.OrderedDict({
+            '_remaining_ids': self._resolve_remaining_ids,
+        })
+
+    def _resolve_remaining_ids(self, parsed_docs):
+        """ Returns the result of find_remaining_ids for the doi of each parsed doc."""
+        dois = [x.get('doi') for x in parsed_docs]
+        ids = find_remaining_ids_batch([x for x in dois if x])
+        return [ids.get(x) if x else None for x in dois]
+
+    def _resolve_post_dependencies(self, parsed_docs):
+        for key, resolve_func in self.post_dependencies.items():
+            results = resolve_func(parsed_docs)
+            for parsed_doc, result in zip(parsed_docs, results):
+                if result is not None:
+                    parsed_doc[key] = result
+
+    def _postprocess(self, doc, parsed_doc):
+        """
+        Post-process an entry to add any last-minute fields required.
+
+        """
+        for key, post_func in self.post_functions.items():
+            result = post_func(doc, parsed_doc)
+            if result is not None:
+                parsed_doc[key] = result
+
+        if '_publish_date' in parsed_doc:
+            del parsed_doc['_publish_date']
+        for key in self.post_dependencies:
+            if key in parsed_doc:
+                del parsed_doc[key]
+
+        return parsed_doc
+
+    def parse(self, doc):
+        """
+        entrance function to parse the api result
+
+        :param doc: (dict) doc returned by the api
+        :return: (dict) metadata of paper
+        """
+        return self.parse_many([doc])[0]
+
+    def parse_many(self, docs):
+        """
+        parse a batch of api results, resolving post_dependencies once for the batch
+
+        :param docs: (list) of (dict) doc returned by the api
+        :return: (list) of (dict) metadata of papers
+        """
+        docs = [self._preprocess(doc) for doc in docs]
+
+        docs_parsed = []
+        for doc in docs:
+            doc_parsed = {}
+            for key, parse_func in self.parse_functions.items():
+                result = parse_func(doc)
+                if result is not None:
+                    doc_parsed[key] = result
+            docs_parsed.append(doc_parsed)
+
+        self._resolve_post_dependencies(docs_parsed)
+
+        return [
+            self._postprocess(doc, doc_parsed)
+            for doc, doc_parsed in zip(docs, docs_parsed)
+        ]
+
+    def _to_metadata_doc(self, data_parsed):
+        doc_parsed = None
+
+        data_parsed['_bt'] = datetime.now()
+
+        if len(data_parsed) > 0:
+            doc_parsed = MetadataDocument(**data_parsed)
+        return doc_parsed
+
+    def get_parsed_doc(self, doc):
+        """
+        check doc type in parsed doc and return a MetadataDocument object
+
+        :param doc: (dict) doc returned by the api
+        :return: (object or None) MetadataDocument object with auto type check.
+                    If not useful information parsed, return None
+        """
+        return self._to_metadata_doc(self.parse(doc))
+
+    def get_parsed_docs(self, docs):
+        """
+        same as get_parsed_doc for a batch of api results
+
+        :param docs: (list) of (dict) doc returned by the api
+        :return: (list) of (object or None) MetadataDocument objects
+        """
+        return [self._to_metadata_doc(x) for x in self.parse_many(docs)]
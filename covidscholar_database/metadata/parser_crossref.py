@@ -1,12 +1,10 @@
 from datetime import datetime
 import collections
 
-from covidscholar_database.metadata.metadata_doc import MetadataDocument
 from covidscholar_database.metadata.common_utils import parse_date
-from covidscholar_database.parse.utils import find_remaining_ids
-from covidscholar_database.parse.base import Parser
+from covidscholar_database.metadata.parser_api import ApiParser
 
-class CrossrefParser(Parser):
+class CrossrefParser(ApiParser):
     """
     Parser for result from crossref API
     """
@@ -377,7 +375,7 @@ class CrossrefParser(Parser):
         """ Returns the pmcid of a document as a <class 'str'>."""
         result = None
         if parsed_doc.get('doi'):
-            ids = find_remaining_ids(parsed_doc['doi'])
+            ids = parsed_doc.get('_remaining_ids') or {}
             if ids.get('pmcid'):
                 result = ids['pmcid']
         return result
@@ -386,61 +384,7 @@ class CrossrefParser(Parser):
         """ Returns the PubMed ID of a document as a <class 'str'>."""
         result = None
         if parsed_doc.get('doi'):
-            ids = find_remaining_ids(parsed_doc['doi'])
+            ids = parsed_doc.get('_remaining_ids') or {}
             if ids.get('pubmed_id'):
                 result = ids['pubmed_id']
         return result
-
-    def _postprocess(self, doc, parsed_doc):
-        """
-        Post-process an entry to add any last-minute fields required.
-
-        """
-        for key, post_func in self.post_functions.items():
-            result = post_func(doc, parsed_doc)
-            if result is not None:
-                parsed_doc[key] = result
-
-        if '_publish_date' in parsed_doc:
-            del parsed_doc['_publish_date']
-
-        return parsed_doc
-
-    def parse(self, doc):
-        """
-        entrance function to parse the crossref api
-
-        :param doc: (dict) doc returned by crossref api
-        :return: (dict) metadata of paper
-        """
-        doc_parsed = {}
-
-        doc = self._preprocess(doc)
-
-        for key, parse_func in self.parse_functions.items():
-            result = parse_func(doc)
-            if result is not None:
-                doc_parsed[key] = result
-
-        doc_parsed = self._postprocess(doc, doc_parsed)
-
-        return doc_parsed
-
-    def get_parsed_doc(self, doc):
-        """
-        check doc type in parsed doc and return a MetadataDocument object
-
-        :param doc: (dict) doc returned by crossref api
-        :return: (object or None) MetadataDocument object with auto type check.
-                    If not useful information parsed, return None
-        """
-        doc_parsed = None
-        data_parsed = self.parse(doc)
-
-        data_parsed['_bt'] = datetime.now()
-
-        if len(data_parsed) > 0:
-            doc_parsed = MetadataDocument(**data_parsed)
-        return doc_parsed
-
-
@@ -1,14 +1,16 @@
 import json
 from pprint import pprint
-import regex
 from datetime import datetime
 import os
 
 from covidscholar_database.metadata.common_utils import get_mongo_db
+from covidscholar_database.metadata.common_utils import doi_url_rm_prefix
+from covidscholar_database.metadata.common_utils import normalize_doi
 from covidscholar_database.metadata.api_crossref import query_crossref_by_doi
 from covidscholar_database.metadata.api_scopus import query_scopus_by_doi
 from covidscholar_database.metadata.api_scopus import change_default_scopus_config
 from covidscholar_database.parse.utils import find_remaining_ids
+from covidscholar_database.parse.doi_key import backfill_doi_keys
 
 PAPER_COLLECTIONS = {
     # 'Vespa_CORD_biorxiv_medrxiv_parsed',
@@ -40,18 +42,15 @@ PAPER_COLLECTIONS = {
     'Vespa_LitCovid_parsed',
 }
 
-def doi_url_rm_prefix(doi_url):
-    doi = doi_url
-    tmp_m = regex.match(r'.*doi.org/(.*)', doi_url)
-    if tmp_m:
-        doi = tmp_m.group(1).strip()
-    return doi
+def iter_paper_dois(mongo_db):
+    """
+    Streams the DOIs of every collection in PAPER_COLLECTIONS, with the doi.org
+    prefix removed. The same DOI may be yielded several times.
 
-def collect_crossref_data(mongo_db):
-    aug_col = mongo_db['metadata_from_api']
-    aug_col.create_index('doi', unique=False)
-
-    for col_name in mongo_db.collection_names():
+    :param mongo_db: (object) a mongo_db object of the COVID database
+    :return: (generator) of (str) doi
+    """
+    for col_name in mongo_db.list_collection_names():
         if col_name not in PAPER_COLLECTIONS:
             continue
         print('col_name', col_name)
@@ -68,7 +67,6 @@ def collect_crossref_data(mongo_db):
         if doi_column_name is None:
             continue
 
-        # interpret csv_raw_result
         query = col.find(
             {
                 doi_column_name: {'$exists': True},
@@ -77,95 +75,109 @@ def collect_crossref_data(mongo_db):
                 doi_column_name: True,
             }
         )
-        for i, doc in enumerate(query):
-            if i%1000 == 0:
-                print('collect_crossref_data in {}: {}'.format(col_name, i, ))
-
+        for doc in query:
             if not (isinstance(doc[doi_column_name], str) and len(doc[doi_column_name]) > 0):
                 continue
-            doi = doi_url_rm_prefix(doc[doi_column_name])
-            query_aug = aug_col.find_one({
-                'doi': doi,
-                'crossref_raw_result': {'$exists': True}
-            })
-            if query_aug:
-                continue
-            try:
-                query_result = query_crossref_by_doi(doi)
-            except Exception as e:
-                query_result = None
-                print(e)
-            if query_result is not None:
-                aug_col.find_one_and_update(
-                    {'doi': doi},
-                    {
-                        '$set': {
-                            'doi': doi,
-                            'crossref_raw_result': query_result,
-                            'last_updated': datetime.now(),
-                        }
-                    }
-                )
+            yield doi_url_rm_prefix(doc[doi_column_name])
+
+def plan_missing_dois(mongo_db, harvested_filter):
+    """
+    Computes the DOIs of PAPER_COLLECTIONS that are not harvested yet with one
+    scan of the sources and one scan of metadata_from_api, instead of one
+    find_one per source document.
+
+    :param mongo_db: (object) a mongo_db object of the COVID database
+    :param harvested_filter: (dict) filter on metadata_from_api matching the records
+        already harvested, e.g. {'crossref_raw_result': {'$exists': True}}
+    :return: (list) deduplicated dois still to harvest, sorted, as first seen in the sources
+    """
+    todo = {}
+    for doi in iter_paper_dois(mongo_db):
+        key = normalize_doi(doi)
+        if key and key not in todo:
+            todo[key] = doi
+
+    query = mongo_db['metadata_from_api'].find(
+        harvested_filter,
+        {
+            '_id': False,
+            'doi': True,
+        }
+    )
+    for doc in query:
+        if isinstance(doc.get('doi'), str):
+            todo.pop(normalize_doi(doc['doi']), None)
 
-def collect_scopus_data(mongo_db):
+    print('dois to harvest:', len(todo))
+    return [todo[key] for key in sorted(todo)]
+
+def collect_crossref_data(mongo_db):
     aug_col = mongo_db['metadata_from_api']
     aug_col.create_index('doi', unique=False)
+    aug_col.create_index('doi_key', unique=False)
+    # the records are matched on doi_key, set it on those written before it existed
+    backfill_doi_keys(aug_col)
+
+    todo = plan_missing_dois(mongo_db, {'crossref_raw_result': {'$exists': True}})
+    for i, doi in enumerate(todo):
+        if i%1000 == 0:
+            print('collect_crossref_data: {} out of {}'.format(i, len(todo)))
+        try:
+            query_result = query_crossref_by_doi(doi)
+        except Exception as e:
+            query_result = None
+            print(e)
+        if query_result is not None:
+            # same key as plan_missing_dois, so that a DOI differing only in case
+            # or prefix updates the existing record instead of adding another, and an
+            # insert gets doi_key from the filter
+            aug_col.update_one(
+                {'doi_key': normalize_doi(doi)},
+                {
+                    '$set': {
+                        'crossref_raw_result': query_result,
+                        'last_updated': datetime.now(),
+                    },
+                    '$setOnInsert': {
+                        'doi': doi,
+                    },
+                },
+                upsert=True
+            )
 
-    for col_name in mongo_db.collection_names():
-        if col_name not in PAPER_COLLECTIONS:
-            continue
-        print('col_name', col_name)
-        col = mongo_db[col_name]
-
-        doi_column_name = None
-        for doc in col.find({}).limit(100):
-            for key in doc:
-                if key.lower() == 'doi':
-                    doi_column_name = key
-                    break
-            if doi_column_name is not None:
-                break
-        if doi_column_name is None:
-            continue
-
-        # interpret csv_raw_result
-        query = col.find(
-            {
-                doi_column_name: {'$exists': True},
-            },
-            {
-                doi_column_name: True,
-            }
-        )
-        for i, doc in enumerate(query):
-            if i%1000 == 0:
-                print('collect_crossref_data in {}: {}'.format(col_name, i, ))
-
-            if not (isinstance(doc[doi_column_name], str) and len(doc[doi_column_name]) > 0):
-                continue
-            doi = doi_url_rm_prefix(doc[doi_column_name])
-            query_aug = aug_col.find_one({
-                'doi': doi,
-                'scopus_raw_result': {'$exists': True}
-            })
-            if query_aug:
-                continue
-            try:
-                query_result = query_scopus_by_doi(doi)
-            except Exception as e:
-                query_result = None
-                print('Error!', type(e), e)
-            if query_result is not None:
-                aug_col.find_one_and_update(
-                    {'doi': doi},
-                    {
-                        '$set': {
-                            'doi': doi,
-                            'scopus_raw_result': query_result,
-                            'last_updated': datetime.now(),
-                        }
-                    }
-                )
+def collect_scopus_data(mongo_db):
+    aug_col = mongo_db['metadata_from_api']
+    aug_col.create_index('doi', unique=False)
+    aug_col.create_index('doi_key', unique=False)
+    # the records are matched on doi_key, set it on those written before it existed
+    backfill_doi_keys(aug_col)
+
+    todo = plan_missing_dois(mongo_db, {'scopus_raw_result': {'$exists': True}})
+    for i, doi in enumerate(todo):
+        if i%1000 == 0:
+            print('collect_scopus_data: {} out of {}'.format(i, len(todo)))
+        try:
+            query_result = query_scopus_by_doi(doi)
+        except Exception as e:
+            query_result = None
+            print('Error!', type(e), e)
+        if query_result is not None:
+            # same key as plan_missing_dois, so that a DOI differing only in case
+            # or prefix updates the existing record instead of adding another, and an
+            # insert gets doi_key from the filter
+            aug_col.update_one(
+                {'doi_key': normalize_doi(doi)},
+                {
+                    '$set': {
+                        'scopus_raw_result': query_result,
+                        'last_updated': datetime.now(),
+                    },
+                    '$setOnInsert': {
+                        'doi': doi,
+                    },
+                },
+                upsert=True
+            )
 
 def collect_pmid_data(mongo_db):
     aug_col = mongo_db['metadata_from_api']
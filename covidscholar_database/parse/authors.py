@@ -0,0 +1,129 @@
+"""
+Author name normalization shared by the parsers and the metadata API parsers.
+
+Sources give authors as one joined string per document ('Smith, John; Doe, J'),
+as 'Last, First' or as PubMed style 'Last Initials'. The same names recur across
+thousands of documents, so the work on each distinct string is cached and the
+functions below only build fresh dicts from the cached results.
+"""
+
+from functools import lru_cache
+
+CACHE_SIZE = 100000
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _split_authors(authors_str, sep):
+    return tuple(authors_str.split(sep))
+
+
+def split_authors(authors_str, sep=';'):
+    """ Returns the names of a joined author string as a <class 'list'> of <class 'str'>,
+    without stripping them."""
+    return list(_split_authors(authors_str, sep))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _last_first(name, sep):
+    if sep in name:
+        pieces = name.split(sep)
+        return pieces[1], pieces[0]
+    return None
+
+
+def last_first_author(name, sep=', '):
+    """ Returns an author dict for a 'Last, First' name, with "first_name" and
+    "last_name", or with only "name" if the name has no separator."""
+    parts = _last_first(name, sep)
+    if parts is None:
+        return {"name": name}
+    return {"first_name": parts[0], "last_name": parts[1]}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def inverted_name(name):
+    """ Returns 'First Last' for a 'Last, First' name, other names as they are."""
+    if ',' in name:
+        name = ' '.join(map(lambda x: x.strip(), reversed(name.split(','))))
+    return name
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def initials_last_name(name):
+    """ Returns 'JA. Smith' for a PubMed style 'Smith JA', other names as they are."""
+    if ' ' in name:
+        last, first = name.split(' ', 1)
+        name = '{0}. '.format(first) + last
+    return name
+
+
+def normalize_authors(authors_strs, sep=';', style='name'):
+    """ Batch API: returns one <class 'list'> of author dicts per joined author string.
+
+    :param authors_strs: (list) of (str) one joined author string per document
+    :param sep: (str) separator between the authors of a string
+    :param style: (str) how each name is written:
+        'name' kept as is, 'last_first' for 'Last, First', 'inverted' for 'Last, First'
+        displayed as 'First Last', 'initials_last' for PubMed style 'Last Initials'
+    """
+    results = []
+    for authors_str in authors_strs:
+        authors = []
+        for name in _split_authors(authors_str, sep):
+            if style == 'last_first':
+                authors.append(last_first_author(name))
+            elif style == 'inverted':
+                authors.append({'name': inverted_name(name)})
+            elif style == 'initials_last':
+                authors.append({'name': initials_last_name(name)})
+            else:
+                authors.append({'name': name})
+        results.append(authors)
+    return results
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_names_str(name_str):
+    names = []
+    fragments = []
+    name_str = name_str.strip()
+
+    num_commas = name_str.count(',')
+    if ';' in name_str:
+        fragments = name_str.split(';')
+    elif num_commas > 1 or (num_commas == 1 and name_str.count(' ') > 2):
+        fragments = name_str.split(',')
+    elif num_commas == 1 or ' ' in name_str:
+        fragments = [name_str]
+    for frag in fragments:
+        if ',' in frag:
+            pieces = frag.split(',')
+            names.append((pieces[-1].strip(), pieces[0].strip()))
+        elif ' ' in frag:
+            pieces = frag.split(' ')
+            names.append((pieces[0].strip(), pieces[-1].strip()))
+        else:
+            names.append((frag.strip(), None))
+    return tuple(names)
+
+
+def parse_names_str(name_str):
+    """ Returns the authors of a joined name string as a <class 'list'> of
+    <class 'dict'> with "first" and "last" (None if unknown)."""
+    return [{'first': first, 'last': last} for first, last in _parse_names_str(name_str)]
+
+
+def parse_names_strs(name_strs):
+    """ Vectorized parse_names_str: one <class 'list'> of names per input string."""
+    return [parse_names_str(x) for x in name_strs]
+
+
+def parse_names_list(name_list):
+    """ Returns the names of crossref style {'given', 'family'} dicts like parse_names_str."""
+    names = []
+    for n in name_list:
+        names.append({
+            'first': n.get('given', None),
+            'last': n.get('family', None),
+        })
+    return names
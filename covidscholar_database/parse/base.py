@@ -1,17 +1,21 @@
+import json
+import time
 from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
 from mongoengine import (
     connect, Document, EmbeddedDocumentField,
     StringField, ListField,
     EmbeddedDocument, EmailField, ValidationError, DateTimeField, DynamicEmbeddedDocument, BooleanField, IntField)
 from utils import find_remaining_ids
+from doi_key import canonical_doi
 
 __all__ = [
     'Author', 'ExtendedParagraph', 'Reference', 'VespaDocument',
-    'Parser'
+    'ParseTimings', 'LazyParsedDocument', 'Parser'
 ]
 
 indexes = [
-    'doi',
+    'doi', 'doi_key',
     'journal', 'journal_short',
     'publication_date',
     'has_full_text',
@@ -61,6 +65,8 @@ class Reference(DynamicEmbeddedDocument):
 
 class VespaDocument(Document):
     doi = StringField(default=None)
+    # canonical_doi(doi), kept up to date on save, used for matching documents
+    doi_key = StringField(default=None)
 
     title = StringField(default=None)
     authors = ListField(EmbeddedDocumentField(Author), default=[])
@@ -120,6 +126,10 @@ class VespaDocument(Document):
     def parser(self):
         raise NotImplementedError
 
+    def clean(self):
+        super().clean()
+        self.doi_key = canonical_doi(self.doi)
+
     def find_missing_ids(self):
         id_fields = [self.to_mongo().get(x, None) for x in ['doi', 'pubmed_id', 'pmcid']]
         ids_not_none = [x is not None for x in id_fields] 
@@ -132,6 +142,131 @@ class VespaDocument(Document):
                     self[k] = v
 
 
+class ParseTimings(object):
+    """
+    Wall time, number of calls and number of exceptions of the _parse_<field> methods
+    (and of _preprocess and _postprocess) per (parser class, field). Recorded by
+    Parser.parse while enabled with Parser.enable_timings().
+    """
+
+    def __init__(self):
+        # (parser, field) -> [seconds, calls, errors]
+        self.stats = {}
+
+    def record(self, parser, field, seconds, failed=False):
+        stat = self.stats.get((parser, field))
+        if stat is None:
+            stat = self.stats[(parser, field)] = [0.0, 0, 0]
+        stat[0] += seconds
+        stat[1] += 1
+        if failed:
+            stat[2] += 1
+
+    def wrap(self, parser, field, func):
+        """ Returns func recording its timing under (parser, field)."""
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                result = func(*args)
+            except Exception:
+                self.record(parser, field, time.perf_counter() - start, failed=True)
+                raise
+            self.record(parser, field, time.perf_counter() - start)
+            return result
+        return timed
+
+    def merge(self, records):
+        """ Adds the records of to_records() of another ParseTimings, e.g. from a worker."""
+        for record in records:
+            stat = self.stats.get((record['parser'], record['field']))
+            if stat is None:
+                stat = self.stats[(record['parser'], record['field'])] = [0.0, 0, 0]
+            stat[0] += record['seconds']
+            stat[1] += record['calls']
+            stat[2] += record['errors']
+
+    def to_records(self):
+        """ Returns the timings as a <class 'list'> of <class 'dict'>, slowest in total first."""
+        records = [
+            {'parser': parser, 'field': field, 'seconds': seconds, 'calls': calls, 'errors': errors}
+            for (parser, field), (seconds, calls, errors) in self.stats.items()
+        ]
+        records.sort(key=lambda x: x['seconds'], reverse=True)
+        return records
+
+    def report(self):
+        """ Returns the timings as a table <class 'str'>, slowest in total first."""
+        lines = ['{:<32} {:<24} {:>12} {:>10} {:>12} {:>8}'.format(
+            'parser', 'field', 'seconds', 'calls', 'ms/call', 'errors')]
+        for record in self.to_records():
+            lines.append('{:<32} {:<24} {:>12.3f} {:>10} {:>12.3f} {:>8}'.format(
+                record['parser'], record['field'], record['seconds'], record['calls'],
+                1000 * record['seconds'] / record['calls'] if record['calls'] else 0.0,
+                record['errors']))
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """ Writes the timings to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_records(), f, indent=2)
+
+
+class LazyParsedDocument(MutableMapping):
+    """
+    Parsed entry returned by Parser.parse(doc, lazy=True). Behaves like the dict
+    of a normal parse, but each field is parsed when it is first read and then
+    cached, so fields that are never read (e.g. references and cited_by, which
+    call external APIs) are never parsed. Fields set by _postprocess or by the
+    caller are stored as given.
+    """
+
+    def __init__(self, doc, parse_functions):
+        self._doc = doc
+        # field -> _parse_<field> method, for the fields not parsed yet
+        self._pending = dict(parse_functions)
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        if key not in self._pending:
+            raise KeyError(key)
+        # popped only once parsed, so that a field whose parse raised raises again
+        value = self._pending[key](self._doc)
+        del self._pending[key]
+        self._values[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._pending.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key in self._pending:
+            del self._pending[key]
+        else:
+            del self._values[key]
+
+    def __iter__(self):
+        yield from list(self._values)
+        yield from list(self._pending)
+
+    def __len__(self):
+        return len(self._values) + len(self._pending)
+
+    def __contains__(self, key):
+        return key in self._values or key in self._pending
+
+    def __repr__(self):
+        return '<LazyParsedDocument parsed={} pending={}>'.format(
+            list(self._values), list(self._pending))
+
+    @property
+    def parsed_fields(self):
+        """ Returns the fields already parsed or set as a <class 'list'>."""
+        return list(self._values)
+
+
 class Parser(ABC):
     """
     Base class for all COVIDScholar parsers. Please implement your parser against this API
@@ -176,6 +311,82 @@ class Parser(ABC):
         "copyright"
     ]
 
+    # fields of a parsed entry, each parsed by _parse_<field>, in parse order
+    parse_fields = [
+        "doi",
+        "title",
+        "authors",
+        "journal",
+        "journal_short",
+        "issn",
+        "publication_date",
+        "abstract",
+        "origin",
+        "source_display",
+        "last_updated",
+        "body_text",
+        "has_full_text",
+        "references",
+        "cited_by",
+        "link",
+        "category_human",
+        "keywords",
+        "summary_human",
+        "has_year",
+        "has_month",
+        "has_day",
+        "is_preprint",
+        "is_covid19",
+        "license",
+        "pmcid",
+        "pubmed_id",
+        "who_covidence",
+        "version",
+        "copyright",
+        "cord_uid",
+        "document_type",
+    ]
+
+    # fields that identify a document, enough for matching entries
+    id_fields = ["doi", "pmcid", "pubmed_id", "cord_uid"]
+
+    # ParseTimings recorded by parse(), None while disabled
+    timings = None
+
+    @staticmethod
+    def enable_timings():
+        """ Starts recording the timings of all parsers, returns the <class 'ParseTimings'>."""
+        if Parser.timings is None:
+            Parser.timings = ParseTimings()
+        return Parser.timings
+
+    @staticmethod
+    def disable_timings():
+        """ Stops recording timings, returns the <class 'ParseTimings'> recorded so far (or None)."""
+        timings = Parser.timings
+        Parser.timings = None
+        return timings
+
+    # version -> fields whose parsing changed in that version, e.g. {3: ["document_type"]}.
+    # When latest_version is bumped, declare the changed fields here so that the documents
+    # parsed by an older version only get those fields reparsed. Versions not declared
+    # mean every field is reparsed.
+    version_changes = {}
+
+    def changed_fields(self, from_version, to_version):
+        """ Returns the fields to reparse for a document parsed by from_version to be
+        up to date with to_version as a <class 'list'>, or None if all must be reparsed."""
+        fields = []
+        for version in range(from_version + 1, to_version + 1):
+            if version not in self.version_changes:
+                return None
+            for field in self.version_changes[version]:
+                if field not in fields:
+                    fields.append(field)
+        if "version" not in fields:
+            fields.append("version")
+        return fields
+
     @abstractmethod
     def _parse_doi(self, doc):
         """ Returns the DOI of a document as a <class 'str'>"""
@@ -381,54 +592,44 @@ class Parser(ABC):
         """
         return parsed_doc
 
-    def parse(self, doc):
+    def parse(self, doc, fields=None, lazy=False):
         """
         Parses the input document into the standardized COVIDScholar entry format.
         Do not overwrite this method with your own 'parse' method!
 
         Args:
             doc: Whatever your input object is.
+            fields: (list) of the fields to parse, default all of parse_fields.
+                e.g. fields=Parser.id_fields to only get the identifiers of a document.
+            lazy: (bool) if True, return a LazyParsedDocument that parses each field
+                when it is first read.
 
         Returns:
 
             (dict) Parsed entry.
 
         """
-        doc = self._preprocess(doc)
-
-        return self._postprocess(doc,
-                                 {
-                                     "doi": self._parse_doi(doc),
-                                     "title": self._parse_title(doc),
-                                     "authors": self._parse_authors(doc),
-                                     "journal": self._parse_journal(doc),
-                                     "journal_short": self._parse_journal_short(doc),
-                                     "issn": self._parse_issn(doc),
-                                     "publication_date": self._parse_publication_date(doc),
-                                     "abstract": self._parse_abstract(doc),
-                                     "origin": self._parse_origin(doc),
-                                     "source_display": self._parse_source_display(doc),
-                                     "last_updated": self._parse_last_updated(doc),
-                                     "body_text": self._parse_body_text(doc),
-                                     "has_full_text": self._parse_has_full_text(doc),
-                                     "references": self._parse_references(doc),
-                                     "cited_by": self._parse_cited_by(doc),
-                                     "link": self._parse_link(doc),
-                                     "category_human": self._parse_category_human(doc),
-                                     "keywords": self._parse_keywords(doc),
-                                     "summary_human": self._parse_summary_human(doc),
-                                     "has_year": self._parse_has_year(doc),
-                                     "has_month": self._parse_has_month(doc),
-                                     "has_day": self._parse_has_day(doc),
-                                     "is_preprint": self._parse_is_preprint(doc),
-                                     "is_covid19": self._parse_is_covid19(doc),
-                                     "license": self._parse_license(doc),
-                                     "pmcid": self._parse_pmcid(doc),
-                                     "pubmed_id": self._parse_pubmed_id(doc),
-                                     "who_covidence": self._parse_who_covidence(doc),
-                                     "version": self._parse_version(doc),
-                                     "copyright": self._parse_copyright(doc),
-                                     "cord_uid": self._parse_cord_uid(doc),
-                                     "document_type": self._parse_document_type(doc)
-                                 }
-                                 )
+        if fields is None:
+            fields = self.parse_fields
+        else:
+            unknown = [x for x in fields if x not in self.parse_fields]
+            if unknown:
+                raise ValueError('Unknown fields: {}'.format(unknown))
+
+        parse_functions = {x: getattr(self, '_parse_' + x) for x in fields}
+        preprocess = self._preprocess
+        postprocess = self._postprocess
+        timings = Parser.timings
+        if timings is not None:
+            name = type(self).__name__
+            parse_functions = {x: timings.wrap(name, x, f) for x, f in parse_functions.items()}
+            preprocess = timings.wrap(name, '_preprocess', preprocess)
+            postprocess = timings.wrap(name, '_postprocess', postprocess)
+
+        doc = preprocess(doc)
+
+        if lazy:
+            parsed_doc = LazyParsedDocument(doc, parse_functions)
+        else:
+            parsed_doc = {x: f(doc) for x, f in parse_functions.items()}
+        return postprocess(doc, parsed_doc)
@@ -5,11 +5,10 @@ from datetime import datetime
 from utils import clean_title, find_cited_by, find_references
 import gridfs
 import traceback
-from io import BytesIO
-from pdf_extractor.paragraphs import extract_paragraphs_pdf
+from pdf_extractor.cache import ExtractionCache
 from mongoengine import DynamicDocument, ReferenceField, DateTimeField
 
-latest_version = 3
+latest_version = 4
 
 class BiorxivDocument(VespaDocument):
     meta = {"collection": "biorxiv_parsed_vespa",
@@ -21,17 +20,28 @@ class BiorxivDocument(VespaDocument):
 
 class BiorxivParser(Parser):
 
-    def __init__(self, parse_full_text=False):
+    # 4: full text extraction stops at the references and after max_pdf_pages, and
+    # finds running headers/footers within header_lookahead following pages
+    version_changes = {4: ["body_text"]}
+
+    def __init__(self, parse_full_text=False, max_pdf_pages=50, header_lookahead=2):
         """
         Parser for documents scraped from the BioRxiv/medRxiv preprint servers.
+
+        Full text extraction stops at the references heading or after max_pdf_pages
+        pages. Pages are laid out only header_lookahead pages ahead of the paragraphs
+        read, so long supplementary material past the references is never laid out.
         """
 
         self.parse_full_text = parse_full_text
+        self.max_pdf_pages = max_pdf_pages
+        self.header_lookahead = header_lookahead
 
         client = pymongo.MongoClient(os.getenv("COVID_HOST"), username=os.getenv("COVID_USER"),
                                      password=os.getenv("COVID_PASS"), authSource=os.getenv("COVID_DB"))
 
         self.db = client[os.getenv("COVID_DB")]
+        self.extraction_cache = ExtractionCache(self.db['pdf_extraction_cache'])
 
     def _parse_doi(self, doc):
         """ Returns the DOI of a document as a <class 'str'>"""
@@ -125,7 +135,9 @@ class BiorxivParser(Parser):
             pdf_file = paper_fs.get(doc['PDF_gridfs_id'])
 
             try:
-                paragraphs = extract_paragraphs_pdf(BytesIO(pdf_file.read()))
+                paragraphs = [p['text'] for p in self.extraction_cache.extract(
+                    pdf_file, max_pages=self.max_pdf_pages, stop_at_references=True,
+                    lookahead=self.header_lookahead)]
             except Exception as e:
                 print('Failed to extract PDF %s(%r) (%r)' % (doc['Doi'], doc['PDF_gridfs_id'], e))
                 traceback.print_exc()
@@ -238,8 +250,8 @@ class UnparsedBiorxivDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         del(parsed_document['PDF_gridfs_id'])
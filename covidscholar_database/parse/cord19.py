@@ -4,6 +4,8 @@ import re
 from datetime import datetime
 import requests
 from utils import clean_title, clean_abstract, find_cited_by, find_references
+from dates import parse_datetime
+from authors import normalize_authors
 from mongoengine import DynamicDocument, ReferenceField, DateTimeField, GenericReferenceField
 from collections import defaultdict
 from crossref.restful import Works
@@ -71,7 +73,7 @@ class CORD19Parser(Parser):
                 if len(author['name']) > 3:
                     author_list.append(author)
         elif 'csv_raw_result' in doc:
-            author_list = [{'name': a} for a in doc['csv_raw_result']['authors'].split(';')]
+            author_list = normalize_authors([doc['csv_raw_result']['authors']], sep=';')[0]
         else:
             author_list = []
             
@@ -165,23 +167,9 @@ class CORD19Parser(Parser):
         if "crossref_raw_result" in doc:
             return self.parse_date_parts(doc).get("publication_date", doc['last_updated'])
         elif "csv_raw_result" in doc:
-            try:
-                date = datetime.strptime(doc['csv_raw_result']['publish_time'],
-                                                  '%Y-%m-%d')
-            except ValueError:
-                try:
-                    date = datetime.strptime(doc['csv_raw_result']['publish_time'],
-                                                      '%Y %b %d')
-                except ValueError:
-                    try:
-                        date = datetime.strptime(
-                            doc['csv_raw_result']['publish_time'], '%Y %b')
-                    except ValueError:
-                        try:
-                            date = datetime.strptime(
-                                doc['csv_raw_result']['publish_time'], '%Y')
-                        except:
-                            date = doc['last_updated']
+            date = parse_datetime(doc['csv_raw_result'].get('publish_time'))
+            if date is None:
+                date = doc['last_updated']
         else:
             date = doc['last_updated']
         return date
@@ -384,7 +372,7 @@ class CORD19Parser(Parser):
         
         if doc_info['type'] == 'book-chapter':
             return 'chapter'
-        else
+        else:
             return 'paper'
         
 
@@ -417,8 +405,8 @@ class UnparsedCORD19CustomDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return CORD19Document(**parsed_document)
@@ -435,8 +423,8 @@ class UnparsedCORD19CommDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return CORD19Document(**parsed_document)
@@ -453,8 +441,8 @@ class UnparsedCORD19NoncommDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return CORD19Document(**parsed_document)
@@ -471,8 +459,8 @@ class UnparsedCORD19XrxivDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return CORD19Document(**parsed_document)
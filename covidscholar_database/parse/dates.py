@@ -0,0 +1,188 @@
+"""
+Date parsing shared by the parsers and the metadata API parsers.
+
+The common formats are recognized by one precompiled regex whose named groups
+give year, month and day directly, instead of trying datetime.strptime formats
+one after the other and catching the ValueError of each miss. The looser
+patterns of the former common_utils.parse_date_str are kept as a fallback.
+Date strings repeat a lot across documents, so results are cached.
+"""
+
+import calendar
+import re
+from datetime import datetime
+from functools import lru_cache
+
+MONTH_DICT = {
+    'jan': 1,
+    'feb': 2,
+    'mar': 3,
+    'apr': 4,
+    'may': 5,
+    'jun': 6,
+    'jul': 7,
+    'aug': 8,
+    'sep': 9,
+    'oct': 10,
+    'nov': 11,
+    'dec': 12,
+}
+MONTH_NAMES = {
+    calendar.month_name[i].lower(): i for i in range(1, 13)
+}
+SEASON_DICT = {
+    'spring': 1,
+    'summer': 4,
+    'autumn': 7,
+    'fall': 7,
+    'winter': 10,
+}
+
+# applied to the stripped, lower case string. Each alternative is named after
+# the strptime format it replaces.
+PATTERN_DATE_DISPATCH = re.compile(
+    r'(?:'
+    # %m/%d/%Y
+    r'(?P<mdY_m>\d{1,2})/(?P<mdY_d>\d{1,2})/(?P<mdY_y>\d{4})'
+    # %Y-%m-%d
+    r'|(?P<Ymd_y>\d{4})-(?P<Ymd_m>\d{1,2})-(?P<Ymd_d>\d{1,2})'
+    # %Y, %Y %b and %Y %b %d
+    r'|(?P<Ybd_y>\d{4})(?:\s+(?P<Ybd_b>[a-z]{3})(?:\s+(?P<Ybd_d>\d{1,2}))?)?'
+    # %B %d %Y, with an optional comma
+    r'|(?P<BdY_b>[a-z]+)\s+(?P<BdY_d>\d{1,2}),?\s+(?P<BdY_y>\d{4})'
+    # %Y%m and %Y%m%d
+    r'|(?P<YmdC_y>\d{4})(?P<YmdC_m>\d{2})(?P<YmdC_d>\d{2})?'
+    # %Y%b%d
+    r'|(?P<YbdC_y>\d{4})(?P<YbdC_b>[a-z]{3})(?P<YbdC_d>\d{1,2})'
+    r')'
+)
+
+PATTERN_DATE_FALLBACK = [
+    re.compile(
+        '(?P<year>[0-9]{{4}}) +(?P<month>{}).*'.format(
+            '|'.join(list(MONTH_DICT.keys()))
+        )
+    ),
+    re.compile(
+        '(?P<year>[0-9]{{4}}) +(?P<season>{}).*'.format(
+            '|'.join(list(SEASON_DICT.keys()))
+        )
+    ),
+    re.compile(
+        '.*(?P<year>[0-9]{4})-(?P<month>[0-9]{1,2})-(?P<day>[0-9]{1,2}).*'
+    ),
+]
+
+
+def _month_number(name, abbreviation_only):
+    if name in MONTH_DICT:
+        return MONTH_DICT[name]
+    if not abbreviation_only:
+        return MONTH_NAMES.get(name)
+    return None
+
+
+def _is_valid(year, month, day):
+    if not 1 <= year <= 9999:
+        return False
+    if month is not None and not 1 <= month <= 12:
+        return False
+    if day is not None and not 1 <= day <= calendar.monthrange(year, month)[1]:
+        return False
+    return True
+
+
+def _dispatch(date_str):
+    m = PATTERN_DATE_DISPATCH.fullmatch(date_str)
+    if m is None:
+        return None
+    groups = m.groupdict()
+    # the alternative that matched is the one with a year
+    prefix = next(k[:-2] for k, v in groups.items() if k.endswith('_y') and v is not None)
+    month = groups.get(prefix + '_m')
+    if month is not None:
+        month = int(month)
+    name = groups.get(prefix + '_b')
+    if name is not None:
+        month = _month_number(name, abbreviation_only=prefix != 'BdY')
+        if month is None:
+            return None
+    day = groups.get(prefix + '_d')
+    parts = (
+        int(groups[prefix + '_y']),
+        month,
+        int(day) if day is not None else None,
+    )
+    return parts if _is_valid(*parts) else None
+
+
+def _fallback(date_str):
+    for a_pattern in PATTERN_DATE_FALLBACK:
+        tmp_m = a_pattern.match(date_str)
+        if tmp_m:
+            result = tmp_m.groupdict()
+            year = int(result['year'])
+            month = None
+            day = None
+            if 'month' in result:
+                if result['month'] in MONTH_DICT:
+                    month = MONTH_DICT[result['month']]
+                else:
+                    month = int(result['month'])
+            if 'season' in result:
+                month = SEASON_DICT[result['season']]
+            if 'day' in result:
+                day = int(result['day'])
+            return year, month, day
+    return None
+
+
+@lru_cache(maxsize=65536)
+def parse_date_parts(date_str):
+    """ Returns (year, month, day) of a date string, with None for the parts that
+    are not given, or None if the string is not a date. Cached."""
+    date_str = date_str.strip().lower()
+    parts = _dispatch(date_str)
+    if parts is None:
+        parts = _fallback(date_str)
+    return parts
+
+
+def parse_date_str(date_str):
+    """ Returns a <class 'dict'> with the 'year', 'month' and 'day' found in a date
+    string, leaving out the parts that are not given. Empty if not a date."""
+    parts = parse_date_parts(date_str)
+    if parts is None:
+        return {}
+    return {
+        k: v for k, v in zip(('year', 'month', 'day'), parts) if v is not None
+    }
+
+
+def parse_date_strs(date_strs):
+    """ Vectorized parse_date_str: parses each distinct string of a column once
+    and returns one <class 'dict'> per input, in order."""
+    distinct = {x: parse_date_parts(x) for x in set(date_strs)}
+    results = []
+    for date_str in date_strs:
+        parts = distinct[date_str]
+        results.append({} if parts is None else {
+            k: v for k, v in zip(('year', 'month', 'day'), parts) if v is not None
+        })
+    return results
+
+
+def parse_datetime(date_str):
+    """ Returns a date string as a <class 'datetime.datetime'>, with the missing
+    month and day set to 1, or None if it is not a valid date."""
+    if not isinstance(date_str, str):
+        return None
+    parts = parse_date_parts(date_str)
+    if parts is None:
+        return None
+    year, month, day = parts
+    month = month or 1
+    day = day or 1
+    if not _is_valid(year, month, day):
+        return None
+    return datetime(year, month, day)
@@ -4,6 +4,8 @@ import re
 from datetime import datetime
 import requests
 from utils import clean_title, find_cited_by, find_references, find_remaining_ids
+from dates import parse_datetime
+from authors import normalize_authors
 from mongoengine import DynamicDocument, GenericReferenceField, DateTimeField, ReferenceField
 from pprint import pprint
 
@@ -45,19 +47,7 @@ class DimensionsParser(Parser):
         """
         if 'authors' in doc.keys():
             if doc['authors'] != '':
-                authors = doc['authors'].split('; ')
-                authors_list = []
-                for author in authors:
-                    if ', ' in author:
-                        first = author.split(', ')[1]
-                        last = author.split(', ')[0]
-                        if len(first) == 1:
-                            authors_list.append({"first_name": first, "last_name": last})
-                        else:
-                            authors_list.append({"first_name": first, "last_name": last})
-                    else:
-                        authors_list.append({"name": author})
-                return authors_list
+                return normalize_authors([doc['authors']], sep='; ', style='last_first')[0]
         return None
 
     def _parse_journal(self, doc):
@@ -78,11 +68,14 @@ class DimensionsParser(Parser):
 
     def _parse_publication_date(self, doc):
         """ Returns the publication_date of a document as a <class 'datetime.datetime'>"""
+        date = None
         if 'publication_date' in doc.keys():
-            return datetime.strptime(doc['publication_date'], '%Y-%m-%d')
-        elif 'publication_year' in doc.keys():
-            return datetime.strptime(str(doc['publication_year']), '%Y')
-        return doc['last_updated']
+            date = parse_datetime(doc['publication_date'])
+        if date is None and 'publication_year' in doc.keys():
+            date = parse_datetime(str(doc['publication_year']))
+        if date is None:
+            date = doc['last_updated']
+        return date
 
     def _parse_has_year(self, doc):
         """ Returns a <class 'bool'> specifying whether a document's year can be trusted."""
@@ -263,8 +256,8 @@ class UnparsedDimensionsPubDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="date_added")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return DimensionsDocument(**parsed_document)
@@ -281,8 +274,8 @@ class UnparsedDimensionsDataDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="date_added")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return DimensionsDocument(**parsed_document)
@@ -299,8 +292,8 @@ class UnparsedDimensionsTrialDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="date_added")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return DimensionsDocument(**parsed_document)
@@ -0,0 +1,59 @@
+"""
+Canonical form of DOIs, used as the doi_key field and as the key of DOI lookups
+and caches, so that 'https://doi.org/10.1000/ABC ' and '10.1000/abc' are the
+same document.
+
+DOIs are case insensitive. The key is the DOI without resolver prefix or 'doi:'
+label, stripped and lower case. Keys are interned: the same DOI is seen in many
+sources, and dict and set lookups on interned strings are cheaper.
+"""
+
+import re
+import sys
+from functools import lru_cache
+
+from pymongo import UpdateOne
+
+DOI_PREFIX_PATTERN = re.compile(
+    r'^(?:https?://)?(?:dx\.|www\.)?doi\.org/|^doi:\s*',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=100000)
+def canonical_doi(doi):
+    """ Returns the canonical key of a DOI as a <class 'str'>, or None if doi is
+    not a non-empty string."""
+    if not isinstance(doi, str):
+        return None
+    key = DOI_PREFIX_PATTERN.sub('', doi.strip()).strip().lower()
+    if not key:
+        return None
+    return sys.intern(key)
+
+
+def backfill_doi_keys(col, batch_size=1000):
+    """
+    set doi_key on the records of a collection that have a doi but no doi_key
+
+    :param col: (object) pymongo collection
+    :param batch_size: (int) number of updates sent at once
+    :return: (int) number of records updated
+    """
+    query = col.find(
+        {'doi': {'$type': 'string'}, 'doi_key': {'$exists': False}},
+        {'_id': True, 'doi': True}
+    )
+    num_updated = 0
+    updates = []
+    for doc in query:
+        updates.append(UpdateOne(
+            {'_id': doc['_id']},
+            {'$set': {'doi_key': canonical_doi(doc['doi'])}}
+        ))
+        if len(updates) >= batch_size:
+            num_updated += col.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        num_updated += col.bulk_write(updates, ordered=False).modified_count
+    return num_updated
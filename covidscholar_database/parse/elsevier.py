@@ -1,13 +1,103 @@
 from base import Parser, VespaDocument, indexes
 import json
+import os
 import re
 from datetime import datetime
 import requests
 from utils import clean_title, find_cited_by, find_references
-from mongoengine import DynamicDocument, ReferenceField, DateTimeField
+from dates import parse_datetime
+from authors import inverted_name
+from mongoengine import DynamicDocument, ReferenceField, DateTimeField, connect
+from pymongo import UpdateOne
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 latest_version = 1
 
+# Mongo field names cannot start with '$' or contain '.', the Elsevier JSON has
+# keys like '$' (text of a node). Escaped with the full width characters when
+# the meta is stored natively.
+KEY_ESCAPES = [('$', '\uff04'), ('.', '\uff0e')]
+
+
+def _escape_key(key):
+    if key.startswith('$'):
+        key = KEY_ESCAPES[0][1] + key[1:]
+    return key.replace(*KEY_ESCAPES[1])
+
+
+def _unescape_key(key):
+    if key.startswith(KEY_ESCAPES[0][1]):
+        key = '$' + key[1:]
+    return key.replace(KEY_ESCAPES[1][1], '.')
+
+
+def _replace_u_caron(text):
+    return text.replace(chr(468), "u")
+
+
+def _map_tree(obj, key_func, str_func=None):
+    if isinstance(obj, dict):
+        return {key_func(k): _map_tree(v, key_func, str_func) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_map_tree(x, key_func, str_func) for x in obj]
+    if str_func is not None and isinstance(obj, str):
+        return str_func(obj)
+    return obj
+
+
+def decode_elsevier_meta(meta):
+    """ Returns the "full-text-retrieval-response" of a raw Elsevier meta as a <class 'dict'>.
+    meta is either the JSON string returned by the API or the structure stored by
+    migrate_elsevier_meta."""
+    if isinstance(meta, dict):
+        return _map_tree(meta, _unescape_key)["full-text-retrieval-response"]
+    # Some payloads have raw newlines inside strings and 'ǔ' for 'u'. The strict
+    # parsers reject the newlines, so try them on the string as is and only fall
+    # back to the lenient json module when needed, instead of copying every
+    # payload twice to escape them beforehand.
+    data = None
+    if orjson is not None:
+        try:
+            data = orjson.loads(meta)
+        except orjson.JSONDecodeError:
+            pass
+    if data is None:
+        data = json.loads(meta, strict=False)
+    if chr(468) in meta:
+        data = _map_tree(data, _replace_u_caron, _replace_u_caron)
+    return data["full-text-retrieval-response"]
+
+
+def migrate_elsevier_meta(col, batch_size=1000):
+    """
+    replace the JSON string meta of the raw Elsevier documents by the decoded structure,
+    so that parsing them no longer decodes JSON. mtime is left as is.
+
+    :param col: (object) pymongo collection of the raw documents (Elsevier_corona_meta)
+    :param batch_size: (int) number of updates sent at once
+    :return: (int) number of documents migrated
+    """
+    query = col.find({'meta': {'$type': 'string'}}, {'_id': True, 'meta': True})
+    num_updated = 0
+    updates = []
+    for doc in query:
+        meta = {"full-text-retrieval-response": decode_elsevier_meta(doc['meta'])}
+        updates.append(UpdateOne(
+            {'_id': doc['_id'], 'meta': {'$type': 'string'}},
+            {'$set': {'meta': _map_tree(meta, _escape_key)}}
+        ))
+        if len(updates) >= batch_size:
+            num_updated += col.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        num_updated += col.bulk_write(updates, ordered=False).modified_count
+    return num_updated
+
+
 class ElsevierDocument(VespaDocument):
 
     meta = {"collection": "Elsevier_parsed_vespa",
@@ -21,7 +111,6 @@ class ElsevierParser(Parser):
     """
     Parser for documents from the Elsevier Novel Coronavirus Information Center.
     """
-
     def _parse_doi(self, doc):
         """ Returns the DOI of a document as a <class 'str'>"""
         return doc["coredata"].get('prism:doi', None)
@@ -41,10 +130,7 @@ class ElsevierParser(Parser):
             authors = metadata["coredata"].get("dc:creator", [])
         authors_parsed = []
         for i in authors:
-            name = i['$']
-            if ',' in name:
-                name = ' '.join(map(lambda x: x.strip(), reversed(name.split(','))))
-            authors_parsed.append({'name': name})
+            authors_parsed.append({'name': inverted_name(i['$'])})
         return authors_parsed
 
     def _parse_journal(self, doc):
@@ -63,7 +149,7 @@ class ElsevierParser(Parser):
     def _parse_publication_date(self, doc):
         """ Returns the publication_date of a document as a <class 'datetime.datetime'>"""
         if "prism:coverDate" in doc["coredata"] and doc["coredata"]["prism:coverDate"]:
-            return datetime.strptime(doc["coredata"].get("prism:coverDate"), '%Y-%m-%d')
+            return parse_datetime(doc["coredata"].get("prism:coverDate"))
         return None
 
     def _parse_has_year(self, doc):
@@ -242,10 +328,7 @@ class ElsevierParser(Parser):
         Returns:
 
         """
-        mds = doc["meta"]
-        mds = mds.replace('\n', '\\n')
-        mds = mds.replace(chr(468), "u")
-        metadata = json.loads(mds)["full-text-retrieval-response"]
+        metadata = decode_elsevier_meta(doc["meta"])
         metadata["mtime"] = doc["mtime"]
         return metadata
 
@@ -274,9 +357,24 @@ class UnparsedElsevierDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="mtime")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         del(parsed_document['mtime'])
-        return ElsevierDocument(**parsed_document)
\ No newline at end of file
+        return ElsevierDocument(**parsed_document)
+
+
+if __name__ == '__main__':
+    # One-shot migration of the stored meta, run it once after deploying, documents
+    # added later with a JSON string meta are still decoded when parsed
+    connect(
+        db=os.getenv("COVID_DB"),
+        name=os.getenv("COVID_DB"),
+        host=os.getenv("COVID_HOST"),
+        username=os.getenv("COVID_USER"),
+        password=os.getenv("COVID_PASS"),
+        authentication_source=os.getenv("COVID_DB"),
+    )
+
+    print('migrated', migrate_elsevier_meta(UnparsedElsevierDocument._get_collection()))
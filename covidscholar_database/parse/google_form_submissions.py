@@ -238,8 +238,8 @@ class UnparsedGoogleFormSubmissionDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return GoogleFormSubmissionDocument(**parsed_document)
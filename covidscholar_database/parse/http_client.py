@@ -0,0 +1,138 @@
+"""
+Process-wide HTTP client for the calls to the enrichment services (opencitations.net,
+NCBI idconv, api.crossref.org, ...).
+
+get_session() returns one requests Session per process, so that the connections of
+a host are kept alive and reused instead of paying TCP and TLS setup per request.
+Its adapters keep a connection pool per host, sized by HOST_POOL_SIZES, retry
+connection errors and 429/5xx answers with exponential backoff (honouring
+Retry-After), and give every request DEFAULT_TIMEOUT unless the caller passes one.
+The transport of http_transport.py (record, replay, stand-in) is mounted on top.
+
+HTTP/2 is not supported by requests. urllib3 has experimental HTTP/2 support, which
+is enabled when HTTP_CLIENT_HTTP2=1 and the h2 package is installed.
+"""
+
+import os
+import threading
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from covidscholar_database.parse.http_transport import get_transport, mount_transport
+except ImportError:
+    from http_transport import get_transport, mount_transport
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+# connections kept open per host, about the number of threads querying it at once
+HOST_POOL_SIZES = {
+    'api.crossref.org': 16,
+    'opencitations.net': 8,
+    'www.ncbi.nlm.nih.gov': 4,
+    'api.elsevier.com': 4,
+}
+DEFAULT_POOL_SIZE = 4
+
+USER_AGENT = 'COVIDScholar Parsers'
+
+# the shared session, the pid and transport it was made for
+session = None
+session_pid = None
+session_transport = None
+session_lock = threading.Lock()
+http2_enabled = False
+
+
+def default_retries():
+    """ Returns the retry policy of the shared session."""
+    return Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['HEAD', 'GET', 'OPTIONS'],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class HttpClientAdapter(HTTPAdapter):
+    """ HTTPAdapter giving a default timeout to the requests sent without one."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def enable_http2():
+    """ Switches urllib3 to HTTP/2 where the server supports it, if HTTP_CLIENT_HTTP2
+    is set and urllib3 and h2 support it. Returns True if enabled."""
+    global http2_enabled
+    if http2_enabled:
+        return True
+    if os.getenv('HTTP_CLIENT_HTTP2') not in ('1', 'true'):
+        return False
+    try:
+        from urllib3.http2 import inject_into_urllib3
+        import h2
+    except ImportError:
+        return False
+    inject_into_urllib3()
+    http2_enabled = True
+    return True
+
+
+def new_session(pool_sizes=None, default_pool_size=DEFAULT_POOL_SIZE, retries=None,
+                timeout=DEFAULT_TIMEOUT, headers=None):
+    """
+    Returns a new requests Session with per host pools, retries, default timeout and
+    the configured transport. Use get_session() unless the calls need another policy.
+
+    :param pool_sizes: (dict) host -> connections kept open, default HOST_POOL_SIZES
+    :param default_pool_size: (int) connections kept open for the other hosts
+    :param retries: (Retry) retry policy, default default_retries()
+    :param timeout: (float or tuple) default (connect, read) timeout
+    :param headers: (dict) headers sent with every request
+    """
+    pool_sizes = HOST_POOL_SIZES if pool_sizes is None else pool_sizes
+    new = Session()
+    new.headers['User-Agent'] = USER_AGENT
+    if headers:
+        new.headers.update(headers)
+
+    def adapter(pool_size, num_hosts):
+        return HttpClientAdapter(
+            timeout=timeout,
+            pool_connections=num_hosts,
+            pool_maxsize=pool_size,
+            max_retries=retries if retries is not None else default_retries(),
+        )
+
+    new.mount('https://', adapter(default_pool_size, 10))
+    new.mount('http://', adapter(default_pool_size, 10))
+    for host, pool_size in pool_sizes.items():
+        new.mount('https://{}/'.format(host), adapter(pool_size, 1))
+    return mount_transport(new)
+
+
+def get_session():
+    """ Returns the session shared by the whole process (made again after a fork or
+    when the transport is configured again)."""
+    global session, session_pid, session_transport
+    transport = get_transport()
+    if session is None or session_pid != os.getpid() or session_transport is not transport:
+        with session_lock:
+            if session is None or session_pid != os.getpid() or session_transport is not transport:
+                enable_http2()
+                session = new_session()
+                session_pid = os.getpid()
+                session_transport = transport
+    return session
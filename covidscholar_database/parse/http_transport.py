@@ -0,0 +1,359 @@
+"""
+Record / replay transport for the HTTP requests to the enrichment services
+(opencitations.net, NCBI idconv, api.crossref.org, and Scopus searches), so that
+enrichment can be benchmarked and reproduced without network.
+
+The transport is a requests adapter mounted on the sessions that make the calls.
+It is chosen with the environment (or configure_transport):
+
+    HTTP_TRANSPORT          live (default), record, replay or standin
+    HTTP_ARCHIVE            archive file, for record, replay and serve
+    HTTP_REPLAY_LATENCY     seconds added to each replayed response, or 'recorded'
+                            to wait as long as the recorded request took
+    HTTP_STANDIN_URL        url of the stand-in server, for standin
+
+record sends the requests and stores every response in the archive, replay answers
+from the archive (404 for requests never recorded), and standin sends the requests
+over HTTP to a local stand-in server answering from an archive:
+
+    python http_transport.py serve archive.sqlite --port 8765 --latency 0.2
+    HTTP_TRANSPORT=standin HTTP_STANDIN_URL=http://127.0.0.1:8765 python ...
+
+The archive is an sqlite file with one row per distinct request (method, url with
+sorted query parameters and body), the body compressed with zlib.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests import Session
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+MODES = ['live', 'record', 'replay', 'standin']
+
+# headers describing the transfer rather than the content, not replayed
+SKIPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'}
+
+# transport configuration, None until configure_transport or the first session
+transport = None
+
+
+def canonical_url(url):
+    """ Returns the url with its query parameters sorted, so that the same request
+    always has the same archive key."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ''))
+
+
+def request_key(method, url, body=None):
+    """ Returns the archive key of a request as a <class 'str'>."""
+    key = '{} {}'.format(method.upper(), canonical_url(url))
+    if body:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key += ' ' + hashlib.blake2b(body, digest_size=16).hexdigest()
+    return key
+
+
+class HttpArchive(object):
+    """
+    Responses stored by request key in an sqlite file. Readers and the writer may be
+    different threads: each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, elapsed REAL'
+            ') WITHOUT ROWID'
+        )
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        """ Returns (status, headers dict, body bytes, elapsed seconds) stored for key, or None."""
+        row = self._connection().execute(
+            'SELECT status, headers, body, elapsed FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), zlib.decompress(row[2]), row[3]
+
+    def put(self, key, status, headers, body, elapsed=0.0):
+        """ Stores a response for key, replacing the one stored before."""
+        with self.write_lock:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO responses (key, status, headers, body, elapsed) VALUES (?, ?, ?, ?, ?)',
+                (key, status, json.dumps(dict(headers)), zlib.compress(body or b''), elapsed)
+            )
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+stats_lock = threading.Lock()
+
+
+def new_stats():
+    """ Returns zeroed transport counters."""
+    return {'sent': 0, 'recorded': 0, 'hits': 0, 'misses': 0}
+
+
+def count(stats, name):
+    with stats_lock:
+        stats[name] += 1
+
+
+def replay_delay(latency, elapsed):
+    """ Returns the seconds to wait before answering a replayed request."""
+    if latency == 'recorded':
+        return elapsed or 0.0
+    if isinstance(latency, (tuple, list)):
+        return random.uniform(*latency)
+    return latency or 0.0
+
+
+def build_response(request, status, headers, body, elapsed=0.0, connection=None):
+    """ Returns a requests Response for a PreparedRequest from stored parts."""
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(
+        {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS})
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK' if status < 400 else 'Not Found' if status == 404 else 'Error'
+    response.elapsed = timedelta(seconds=elapsed)
+    response.connection = connection
+    return response
+
+
+class RecordReplayAdapter(BaseAdapter):
+    """
+    requests adapter sending requests through inner (an HTTPAdapter by default) in
+    live and record mode, answering them from the archive in replay mode, and
+    sending them to the stand-in server in standin mode. Counts the requests sent,
+    recorded and answered from the archive (hits, misses) in stats, which may be
+    shared by several adapters.
+    """
+
+    def __init__(self, mode, archive=None, latency=None, standin_url=None, inner=None, stats=None):
+        super().__init__()
+        if mode not in MODES:
+            raise ValueError('Unknown transport mode {}, expected one of {}'.format(mode, MODES))
+        if mode in ('record', 'replay') and archive is None:
+            raise ValueError('The {} transport needs an archive'.format(mode))
+        if mode == 'standin' and not standin_url:
+            raise ValueError('The standin transport needs the url of the stand-in server')
+        self.mode = mode
+        self.archive = archive
+        self.latency = latency
+        self.standin_url = standin_url.rstrip('/') if standin_url else None
+        self.inner = inner or HTTPAdapter()
+        self.stats = stats if stats is not None else new_stats()
+
+    def send(self, request, **kwargs):
+        if self.mode == 'replay':
+            return self._replay(request)
+        if self.mode == 'standin':
+            return self._send_standin(request, **kwargs)
+
+        count(self.stats, 'sent')
+        start = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        if self.mode == 'record':
+            self.archive.put(
+                request_key(request.method, request.url, request.body),
+                response.status_code, response.headers, response.content,
+                time.perf_counter() - start
+            )
+            count(self.stats, 'recorded')
+        return response
+
+    def _replay(self, request):
+        stored = self.archive.get(request_key(request.method, request.url, request.body))
+        if stored is None:
+            count(self.stats, 'misses')
+            return build_response(request, 404, {'X-Archive-Miss': '1'}, b'', connection=self)
+        count(self.stats, 'hits')
+        status, headers, body, elapsed = stored
+        delay = replay_delay(self.latency, elapsed)
+        if delay:
+            time.sleep(delay)
+        return build_response(request, status, headers, body, delay, connection=self)
+
+    def _send_standin(self, request, **kwargs):
+        # https://api.crossref.org/works/x -> {standin_url}/https/api.crossref.org/works/x
+        parts = urlsplit(request.url)
+        standin = request.copy()
+        standin.url = '{}/{}/{}{}'.format(
+            self.standin_url, parts.scheme, parts.netloc, urlunsplit(('', '', parts.path, parts.query, '')))
+        count(self.stats, 'sent')
+        response = self.inner.send(standin, **kwargs)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def configure_transport(mode=None, archive=None, latency=None, standin_url=None):
+    """
+    Sets the transport of the sessions made by transport_session and mount_transport,
+    from the arguments or else from the environment (see the module docstring).
+    Returns the configuration as a <class 'dict'>.
+    """
+    global transport
+    mode = mode or os.getenv('HTTP_TRANSPORT') or 'live'
+    if mode not in MODES:
+        raise ValueError('Unknown transport mode {}, expected one of {}'.format(mode, MODES))
+    archive = archive or os.getenv('HTTP_ARCHIVE')
+    if isinstance(archive, str):
+        archive = HttpArchive(archive)
+    if latency is None:
+        latency = os.getenv('HTTP_REPLAY_LATENCY')
+        if latency and latency != 'recorded':
+            latency = float(latency)
+    transport = {
+        'mode': mode,
+        'archive': archive,
+        'latency': latency,
+        'standin_url': standin_url or os.getenv('HTTP_STANDIN_URL'),
+        # counters of all the sessions using this configuration
+        'stats': new_stats(),
+    }
+    return transport
+
+
+def get_transport():
+    """ Returns the transport configuration, read from the environment on first use."""
+    if transport is None:
+        configure_transport()
+    return transport
+
+
+def mount_transport(session):
+    """ Mounts the configured transport on a requests Session, on top of each adapter
+    already mounted (for http://, https:// and any host prefix). Returns the session."""
+    config = get_transport()
+    if config['mode'] == 'live':
+        return session
+    for prefix, inner in list(session.adapters.items()):
+        if isinstance(inner, RecordReplayAdapter):
+            continue
+        session.mount(prefix, RecordReplayAdapter(
+            config['mode'], archive=config['archive'], latency=config['latency'],
+            standin_url=config['standin_url'], inner=inner, stats=config['stats']))
+    return session
+
+
+def transport_session():
+    """ Returns a new requests Session using the configured transport."""
+    return mount_transport(Session())
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """ Answers /{scheme}/{host}/{path}?{query} with the archived response of
+    {scheme}://{host}/{path}?{query}."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        pieces = self.path.lstrip('/').split('/', 2)
+        stored = None
+        if len(pieces) >= 2:
+            url = '{}://{}/{}'.format(pieces[0], pieces[1], pieces[2] if len(pieces) > 2 else '')
+            stored = self.server.archive.get(request_key(self.command, url, body))
+        if stored is None:
+            status, headers, content, elapsed = 404, {'X-Archive-Miss': '1'}, b'', 0.0
+        else:
+            status, headers, content, elapsed = stored
+        delay = replay_delay(self.server.latency, elapsed)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        for k, v in headers.items():
+            if k.lower() not in SKIPPED_HEADERS:
+                self.send_header(k, v)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = _answer
+    do_POST = _answer
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_archive(archive, host='127.0.0.1', port=0, latency=None):
+    """
+    Starts the stand-in server for an archive in a background thread.
+
+    :param archive: (HttpArchive or str) archive or path of the archive file
+    :param port: (int) port to listen to, 0 for any free port
+    :param latency: (float, tuple or 'recorded') delay of each answer, see replay_delay
+    :return: (ThreadingHTTPServer) server, its url is 'http://%s:%d' % server.server_address
+    """
+    server = ThreadingHTTPServer((host, port), StandinRequestHandler)
+    server.daemon_threads = True
+    server.archive = HttpArchive(archive) if isinstance(archive, str) else archive
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+
+    arg_parser = argparse.ArgumentParser(description='Stand-in server answering from an HTTP archive')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='serve an archive over HTTP')
+    serve_parser.add_argument('archive', help='archive file written in record mode')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', default=None, help="seconds per answer, or 'recorded'")
+    stats_parser = subparsers.add_parser('stats', help='number of responses in an archive')
+    stats_parser.add_argument('archive')
+    args = arg_parser.parse_args()
+
+    if args.command == 'stats':
+        print('responses:', len(HttpArchive(args.archive)))
+    else:
+        latency = args.latency
+        if latency and latency != 'recorded':
+            latency = float(latency)
+        server = serve_archive(args.archive, args.host, args.port, latency)
+        print('serving {} on http://{}:{}'.format(args.archive, *server.server_address))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
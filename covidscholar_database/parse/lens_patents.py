@@ -195,8 +195,8 @@ class UnparsedLensDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="Last_Updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return LensPatentDocument(**parsed_document)
@@ -3,12 +3,14 @@ from datetime import datetime
 import json
 import requests
 from utils import clean_title, find_cited_by, find_references, find_remaining_ids
+from dates import parse_datetime
+from authors import initials_last_name
 from pprint import PrettyPrinter
 import xml.etree.ElementTree as ET
 from lxml import etree
 from mongoengine import DynamicDocument, ReferenceField, DateTimeField
 
-latest_version = 3
+latest_version = 4
 
 class LitCovidDocument(VespaDocument):
     meta = {"collection": "Litcovid_parsed_vespa",
@@ -23,6 +25,9 @@ class LitCovidParser(Parser):
     Parser for documents from LitCovid
     """
 
+    # 4: author names are normalized with the shared initials_last_name helper
+    version_changes = {4: ["authors"]}
+
     def _parse_doi(self, doc):
         """ Returns the DOI of a document as a <class 'str'>"""
         doi_fetch = find_remaining_ids(str(doc['pmid']))['doi']
@@ -41,14 +46,7 @@ class LitCovidParser(Parser):
         full name (e.g. John Smith or J. Smith) as a <class 'str'>.
         """
         if 'authors' in doc.keys():
-            authors = []
-            for author in doc['authors']:
-                if ' ' in author:
-                    first = '{0}. '.format(author.split(' ', 1)[1])
-                    last = author.split(' ', 1)[0]
-                    author = first + last
-                authors.append(author)
-            return authors
+            return [{'name': initials_last_name(author)} for author in doc['authors']]
         return None
 
     def _parse_journal(self, doc):
@@ -94,19 +92,8 @@ class LitCovidParser(Parser):
 
     def _parse_publication_date(self, doc):
         """ Returns the publication_date of a document as a <class 'datetime.datetime'>"""
-        try:
-            datestring = self._parse_datestring(doc)
-            if datestring.isdigit():
-                if len(datestring) == 8:
-                    return datetime.strptime(datestring, '%Y%m%d')
-                elif len(datestring) == 6:
-                    return datetime.strptime(datestring, '%Y%m')
-                elif len(datestring) == 4:
-                    return datetime.strptime(datestring, '%Y')
-            else:
-                return datetime.strptime(datestring, '%Y%b%d')
-        except:
-            return None
+        # e.g. 20200316, 202003, 2020 or 2020Mar16
+        return parse_datetime(self._parse_datestring(doc))
 
     def _parse_has_year(self, doc):
         """ Returns a <class 'bool'> specifying whether a document's year can be trusted."""
@@ -274,8 +261,8 @@ class UnparsedLitCovidDocument(DynamicDocument):
 
     last_updated = DateTimeField(db_field="last_updated")
 
-    def parse(self):
-        parsed_document = self.parser.parse(self.to_mongo())
+    def parse(self, fields=None):
+        parsed_document = self.parser.parse(self.to_mongo(), fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return LitCovidDocument(**parsed_document)
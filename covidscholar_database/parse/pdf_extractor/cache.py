@@ -0,0 +1,125 @@
+import hashlib
+import json
+from datetime import datetime
+
+import pymongo
+
+from .paragraphs import iter_paragraphs_pdf, extractor_version, default_laparams
+from .spool import spooled_gridfs_file
+
+
+def params_hash(laparams=None, **options):
+    """
+    Stable hash of the effective layout parameters, i.e. the defaults used by
+    TextHandler updated with the ones passed in, and of the other extraction options.
+
+    :param laparams: (dict or None) overrides passed to extract_paragraphs_pdf
+    :param options: other keyword arguments of iter_paragraphs_pdf, e.g. max_pages
+    :return: (str) hex digest
+    """
+    _laparams = dict(default_laparams)
+    _laparams.update(laparams or {})
+    if options.get('page_numbers') is not None:
+        options['page_numbers'] = sorted(options['page_numbers'])
+    return hashlib.md5(
+        json.dumps([_laparams, options], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+class ExtractionCache(object):
+    """
+    Content-addressed store of extract_paragraphs_pdf(return_dicts=True) results.
+
+    Entries are keyed by (md5 of the PDF, extractor_version, params hash), so a
+    parser version bump reuses previous extractions, while a change to the
+    extractor itself, to the layout parameters or to the options misses the cache.
+    """
+
+    def __init__(self, collection):
+        """
+        :param collection: (pymongo.collection.Collection) where entries are stored,
+            e.g. db['pdf_extraction_cache']
+        """
+        self.collection = collection
+        self._indexed = False
+
+    def _ensure_index(self):
+        # Deferred so that constructing a parser at import time does not touch the db
+        if not self._indexed:
+            self.collection.create_index(
+                [
+                    ('md5', pymongo.ASCENDING),
+                    ('extractor_version', pymongo.ASCENDING),
+                    ('params_hash', pymongo.ASCENDING),
+                ],
+                unique=True
+            )
+            self._indexed = True
+
+    @staticmethod
+    def _key(md5, laparams=None, **options):
+        return {
+            'md5': md5,
+            'extractor_version': extractor_version,
+            'params_hash': params_hash(laparams, **options),
+        }
+
+    def get(self, md5, laparams=None, **options):
+        """
+        :param md5: (str) md5 of the PDF
+        :param laparams: (dict or None) layout parameters of the extraction
+        :param options: other extraction options
+        :return: (list or None) paragraph dicts, None on a cache miss
+        """
+        self._ensure_index()
+        entry = self.collection.find_one(self._key(md5, laparams, **options), {'paragraphs': True})
+        if entry is None:
+            return None
+        return entry['paragraphs']
+
+    def put(self, md5, paragraphs, laparams=None, **options):
+        """
+        :param md5: (str) md5 of the PDF
+        :param paragraphs: (list) paragraph dicts from extract_paragraphs_pdf
+        :param laparams: (dict or None) layout parameters of the extraction
+        :param options: other extraction options
+        """
+        self._ensure_index()
+        key = self._key(md5, laparams, **options)
+        self.collection.update_one(
+            key,
+            {
+                '$set': {
+                    'paragraphs': paragraphs,
+                    'last_updated': datetime.now(),
+                }
+            },
+            upsert=True
+        )
+
+    def extract(self, grid_out, laparams=None, **options):
+        """
+        Returns the paragraph dicts of a GridFS PDF, running pdfminer only when
+        no cached result exists for this content.
+
+        :param grid_out: (gridfs.GridOut) PDF file
+        :param laparams: (dict or None) layout parameters of the extraction
+        :param options: other keyword arguments of iter_paragraphs_pdf, e.g.
+            max_pages or stop_at_references
+        :return: (list) paragraph dicts
+        """
+        # Files written by older drivers carry their md5, which avoids reading them on a hit
+        if grid_out.md5:
+            paragraphs = self.get(grid_out.md5, laparams, **options)
+            if paragraphs is not None:
+                return paragraphs
+
+        with spooled_gridfs_file(grid_out) as (pdf_file, md5):
+            paragraphs = None
+            if not grid_out.md5:
+                paragraphs = self.get(md5, laparams, **options)
+            if paragraphs is None:
+                paragraphs = list(iter_paragraphs_pdf(
+                    pdf_file, return_dicts=True, laparams=laparams, **options))
+                self.put(md5, paragraphs, laparams, **options)
+        return paragraphs
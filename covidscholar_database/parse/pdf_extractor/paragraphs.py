@@ -1,6 +1,6 @@
 import re
 import string
-from collections import Counter
+from collections import Counter, deque
 from io import StringIO
 
 from pdfminer.converter import TextConverter
@@ -10,20 +10,69 @@ from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.pdfpage import PDFPage
 from pdfminer.pdfparser import PDFParser
-from pdfminer.utils import Plane, uniq
+from pdfminer.utils import Plane
 
 import sys
 
+# Bump whenever a change here alters the paragraphs produced for the same PDF.
+extractor_version = '1'
+
+default_laparams = {
+    'char_margin': 3.0,
+    'line_margin': 2.5
+}
+
+
+def _horizontal_neighbors(line, objs, d):
+    """Same test as LTTextLineHorizontal.find_neighbors with tolerance d, applied
+    to candidates that were already looked up in the plane."""
+    x0, y0, x1, y1 = line.x0, line.y0 - d, line.x1, line.y1 + d
+    height = line.height
+    center = (line.x0 + line.x1) / 2
+    return [
+        obj for obj in objs
+        if isinstance(obj, LTTextLineHorizontal)
+        and not (obj.x1 <= x0 or x1 <= obj.x0 or obj.y1 <= y0 or y1 <= obj.y0)
+        and abs(height - obj.height) <= d
+        and (abs(line.x0 - obj.x0) <= d
+             or abs(line.x1 - obj.x1) <= d
+             or abs(center - (obj.x0 + obj.x1) / 2) <= d)
+    ]
+
 
 def group_textlines(self, laparams, lines):
     """Patched class method that fixes empty line aggregation, and allows
-    run-time line margin detection"""
+    run-time line margin detection.
+
+    Every line queries the plane once; the paragraph specific margin only
+    narrows those candidates down. Lines are merged into boxes with a
+    disjoint-set."""
     plane = Plane(self.bbox)
     plane.extend(lines)
-    boxes = {}
-    for line in lines:
-        neighbors = line.find_neighbors(plane, laparams.line_margin)
-        if line not in neighbors or not line.get_text().strip():
+
+    index = {line: i for i, line in enumerate(lines)}
+    has_text = [bool(line.get_text().strip()) for line in lines]
+    grouped = [False] * len(lines)
+    parent = list(range(len(lines)))
+
+    def find_root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, line in enumerate(lines):
+        if not has_text[i]:
+            continue
+
+        horizontal = isinstance(line, LTTextLineHorizontal)
+        if horizontal:
+            d = laparams.line_margin * line.height
+            candidates = list(plane.find((line.x0, line.y0 - d, line.x1, line.y1 + d)))
+            neighbors = _horizontal_neighbors(line, candidates, d)
+        else:
+            neighbors = line.find_neighbors(plane, laparams.line_margin)
+        if line not in neighbors:
             continue
 
         # Correct margin to paragraph specific
@@ -36,32 +85,37 @@ def group_textlines(self, laparams, lines):
             if margin < true_margin:
                 true_margin = margin
 
-        neighbors = line.find_neighbors(plane, true_margin)
+        if horizontal:
+            neighbors = _horizontal_neighbors(line, candidates, true_margin * line.height)
+        else:
+            neighbors = line.find_neighbors(plane, true_margin)
         if line not in neighbors:
             continue
 
-        members = []
+        root = find_root(i)
         for obj1 in neighbors:
-            if not obj1.get_text().strip():
+            j = index[obj1]
+            if not has_text[j]:
                 continue
-            members.append(obj1)
-            if obj1 in boxes:
-                members.extend(boxes.pop(obj1))
-        if isinstance(line, LTTextLineHorizontal):
-            box = LTTextBoxHorizontal()
-        else:
-            box = LTTextBoxVertical()
-        for obj in uniq(members):
-            box.add(obj)
-            boxes[obj] = box
-    done = set()
-    for line in lines:
-        if line not in boxes:
-            continue
-        box = boxes[line]
-        if box in done:
+            grouped[j] = True
+            other = find_root(j)
+            if other != root:
+                parent[other] = root
+
+    boxes = {}
+    for i, line in enumerate(lines):
+        if not grouped[i]:
             continue
-        done.add(box)
+        root = find_root(i)
+        box = boxes.get(root)
+        if box is None:
+            if isinstance(line, LTTextLineHorizontal):
+                box = LTTextBoxHorizontal()
+            else:
+                box = LTTextBoxVertical()
+            boxes[root] = box
+        box.add(line)
+    for box in boxes.values():
         if not box.is_empty():
             yield box
     return
@@ -73,10 +127,7 @@ LTLayoutContainer.group_textlines = group_textlines
 
 class TextHandler(TextConverter):
     def __init__(self, rsrcmgr, laparams=None):
-        _laparams = {
-            'char_margin': 3.0,
-            'line_margin': 2.5
-        }
+        _laparams = dict(default_laparams)
         _laparams.update(laparams or {})
         super(TextHandler, self).__init__(
             rsrcmgr, StringIO(), laparams=LAParams(**_laparams))
@@ -100,95 +151,196 @@ class TextHandler(TextConverter):
         render(ltpage)
         self.pages.append(paragraphs)
 
-    def get_true_paragraphs(self):
-        # Drop redundant paragraphs
+    def iter_true_paragraphs(self, pages=None, lookahead=None):
+        """
+        Yields (page_num, paragraphs) for each page, dropping paragraphs repeated
+        across pages (running headers/footers) and number only paragraphs, with
+        newlines and excessive whitespaces converted to single spaces.
+
+        :param pages: (iterable or None) (page_num, paragraphs) pairs, consumed lazily.
+            Defaults to the pages received so far.
+        :param lookahead: (int or None) how many following pages must be read before
+            a page is yielded, so that its repeated paragraphs can be recognized.
+            None reads the whole document first.
+        """
+        if pages is None:
+            pages = enumerate(self.pages)
+        if lookahead is None:
+            pages = list(pages)
+            lookahead = len(pages)
+
         counter_by_page = Counter()
-        for page in self.pages:
-            for item in page:
-                counter_by_page[item['text']] += 1
-        redundant = set(x for x, y in counter_by_page.items() if y > 1)
-        for page in self.pages:
-            page[:] = list(filter(
-                lambda x: x['text'] not in redundant,
-                page
-            ))
-
-        # Drop number only paragraphs
-        printable = set(string.printable)
-        for page in self.pages:
-            new_page = []
-            for item in page:
-                normalized_text = ''.join((filter(lambda k: k in printable, item['text']))).strip()
-                words = re.findall(r'[a-zA-Z]', item['text'])
-                if len(words) > 0.5 * len(normalized_text):
-                    new_page.append(item)
-            page[:] = new_page
-
-        # Convert newlines and excessive whitespaces
-        for page in self.pages:
-            for word in page:
-                word['text'] = re.sub(r'\s+', ' ', word['text'])
+        buffered = deque()
+        for page_num, page in pages:
+            counter_by_page.update(item['text'] for item in page)
+            buffered.append((page_num, page))
+            if len(buffered) > lookahead:
+                yield self._true_page(buffered.popleft(), counter_by_page)
+        while buffered:
+            yield self._true_page(buffered.popleft(), counter_by_page)
+
+    @staticmethod
+    def _true_page(numbered_page, counter_by_page):
+        page_num, page = numbered_page
+        new_page = []
+        for item in page:
+            text = item['text']
+            if counter_by_page[text] > 1 or not _is_mostly_letters(text):
+                continue
+            item['text'] = _whitespace_pattern.sub(' ', text)
+            new_page.append(item)
+        return page_num, new_page
 
+    def get_true_paragraphs(self):
+        self.pages = [page for _, page in self.iter_true_paragraphs()]
         return self.pages
 
 
-def extract_paragraphs_pdf(pdf_file, return_dicts=False, only_printable=True, laparams=None):
-    """
-    pdf_file is a file-like object.
-    This function will return lists of plain-text paragraphs."""
-    parser = PDFParser(pdf_file)
-    doc = PDFDocument(parser)
-    rsrcmgr = PDFResourceManager()
-    device = TextHandler(rsrcmgr, laparams=laparams)
-    interpreter = PDFPageInterpreter(rsrcmgr, device)
-    for page in PDFPage.create_pages(doc):
-        interpreter.process_page(page)
+_non_printable_ascii = str.maketrans('', '', ''.join(
+    chr(i) for i in range(128) if chr(i) not in string.printable))
+_ascii_letters = str.maketrans('', '', string.ascii_letters)
+_whitespace_pattern = re.compile(r'\s+')
+_ending_char_pattern = re.compile(r'!\.\?')
+_references_heading_pattern = re.compile(
+    r'^(\d+\.?\s*)?(references|bibliography|literature cited|references and notes|works cited)\s*:?$',
+    re.IGNORECASE)
+
 
-    def paragraph_pos_rank(p):
-        x, y = p['bbox'][0], -p['bbox'][1]
-        return int(y)
+def _to_printable(text):
+    """Keeps only the characters in string.printable"""
+    return text.encode('ascii', 'ignore').decode('ascii').translate(_non_printable_ascii)
 
-    def is_ending_char(c):
-        return re.match(r'!\.\?', c) is not None
 
-    paragraphs = []
+def _is_mostly_letters(text):
+    printable_text = _to_printable(text)
+    num_letters = len(printable_text) - len(printable_text.translate(_ascii_letters))
+    return num_letters > 0.5 * len(printable_text.strip())
 
-    printable = set(string.printable)
-    for page_num, page in enumerate(device.get_true_paragraphs()):
-        for j, p in enumerate(sorted(page, key=paragraph_pos_rank)):
+
+def _paragraph_pos_rank(p):
+    return int(-p['bbox'][1])
+
+
+def _is_ending_char(c):
+    return _ending_char_pattern.match(c) is not None
+
+
+def _is_references_heading(text):
+    return len(text) < 40 and _references_heading_pattern.match(text) is not None
+
+
+def iter_paragraphs(pages, return_dicts=False, only_printable=True, max_pages=None, max_paragraphs=None,
+                    stop_at_references=False):
+    """
+    Turns pages of paragraphs (as yielded by TextHandler.iter_true_paragraphs) into
+    a stream of plain-text paragraphs, joining a paragraph that continues on the
+    next page.
+
+    :param pages: (iterable) (page_num, paragraphs) pairs, paragraphs being {'text', 'bbox'} dicts
+    :param return_dicts: (bool) yield dicts with page_num, indention_level and bbox
+    :param only_printable: (bool) drop characters not in string.printable
+    :param max_pages: (int or None) stop after this many pages
+    :param max_paragraphs: (int or None) stop after this many paragraphs
+    :param stop_at_references: (bool) stop at the references section heading
+    """
+    pending = None
+    num_paragraphs = 0
+    for i, (page_num, page) in enumerate(pages):
+        if max_pages is not None and i >= max_pages:
+            break
+        for j, p in enumerate(sorted(page, key=_paragraph_pos_rank)):
             text = p['text']
 
             if only_printable:
-                text = ''.join(filter(lambda x: x in printable, text))
+                text = _to_printable(text)
 
             text = text.strip()
 
+            if stop_at_references and _is_references_heading(text):
+                if pending is not None:
+                    yield pending
+                return
+
             indention_level = int(p['bbox'][0] / 10)
 
-            if j == 0 and len(paragraphs) > 0:
-                last_paragraph = paragraphs[-1]
-                if return_dicts:
-                    last_paragraph = last_paragraph['text']
-                should_join = (not is_ending_char(last_paragraph[-1]) and
+            if j == 0 and pending is not None:
+                last_paragraph = pending['text'] if return_dicts else pending
+                should_join = (not _is_ending_char(last_paragraph[-1]) and
                                not text[0].isupper())
 
                 if should_join:
                     text = last_paragraph + ' ' + text
                     if return_dicts:
-                        indention_level = paragraphs[-1]['indention_level']
-                    del paragraphs[-1]
+                        indention_level = pending['indention_level']
+                    pending = None
+
+            if pending is not None:
+                yield pending
+                num_paragraphs += 1
+                if max_paragraphs is not None and num_paragraphs >= max_paragraphs:
+                    return
 
             if return_dicts:
-                paragraphs.append({
+                pending = {
                     'text': text,
                     'page_num': page_num,
                     'indention_level': indention_level,
                     'bbox': p['bbox']
-                })
+                }
             else:
-                paragraphs.append(text)
+                pending = text
+
+    if pending is not None:
+        yield pending
+
 
-    return paragraphs
+def iter_paragraphs_pdf(pdf_file, return_dicts=False, only_printable=True, laparams=None,
+                        max_pages=None, max_paragraphs=None, page_numbers=None,
+                        stop_at_references=False, lookahead=None):
+    """
+    pdf_file is a file-like object.
+    Generator version of extract_paragraphs_pdf. Passing max_pages or page_numbers
+    skips the other pages entirely. With an int lookahead, pages are also laid out only
+    as the paragraphs are consumed, so stopping early (or max_paragraphs and
+    stop_at_references) skips the remaining pages.
+
+    :param page_numbers: (container or None) 0-based numbers of the pages to read, e.g. range(0, 10)
+    :param lookahead: (int or None) pages read ahead to detect running headers/footers.
+        None reads the whole document (or its first max_pages pages) first, which is what
+        extractor_version results are made with; an int changes the output (ExtractionCache
+        keys it with the other options).
+    """
+    parser = PDFParser(pdf_file)
+    doc = PDFDocument(parser)
+    rsrcmgr = PDFResourceManager()
+    device = TextHandler(rsrcmgr, laparams=laparams)
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+
+    def layout_pages():
+        num_pages = 0
+        for page_num, page in enumerate(PDFPage.create_pages(doc)):
+            if max_pages is not None and num_pages >= max_pages:
+                return
+            if page_numbers is not None and page_num not in page_numbers:
+                continue
+            interpreter.process_page(page)
+            num_pages += 1
+            yield page_num, device.pages.pop()
+
+    pages = device.iter_true_paragraphs(layout_pages(), lookahead=lookahead)
+    for paragraph in iter_paragraphs(pages, return_dicts=return_dicts, only_printable=only_printable,
+                                     max_pages=max_pages, max_paragraphs=max_paragraphs,
+                                     stop_at_references=stop_at_references):
+        yield paragraph
+
+
+def extract_paragraphs_pdf(pdf_file, return_dicts=False, only_printable=True, laparams=None, **kwargs):
+    """
+    pdf_file is a file-like object.
+    This function will return lists of plain-text paragraphs. Extra keyword arguments
+    (max_pages, page_numbers, stop_at_references, ...) go to iter_paragraphs_pdf."""
+    return list(iter_paragraphs_pdf(pdf_file, return_dicts=return_dicts,
+                                    only_printable=only_printable, laparams=laparams, **kwargs))
 
 
 if __name__ == '__main__':
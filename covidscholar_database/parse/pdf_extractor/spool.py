@@ -0,0 +1,40 @@
+import hashlib
+import mmap
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+
+
+@contextmanager
+def spooled_gridfs_file(grid_out):
+    """
+    Copies a GridFS file chunk by chunk into an anonymous temporary file and yields
+    it memory-mapped, so that neither the whole PDF nor a copy of it is held in the
+    worker's memory. pdfminer only needs read/seek/tell, which the mmap provides.
+
+    A GridOut can also be given to iter_paragraphs_pdf directly, but pdfminer seeks
+    around the file a lot and every seek to another chunk is a round-trip to Mongo.
+
+    :param grid_out: (gridfs.GridOut) file to read
+    :return: (tuple) file-like object and md5 hex digest of the content
+    """
+    digest = hashlib.md5()
+    with tempfile.TemporaryFile() as tmp:
+        grid_out.seek(0)
+        chunk = grid_out.readchunk()
+        while chunk:
+            digest.update(chunk)
+            tmp.write(chunk)
+            chunk = grid_out.readchunk()
+        tmp.flush()
+
+        if tmp.tell() == 0:
+            # empty files cannot be mapped
+            yield BytesIO(), digest.hexdigest()
+            return
+
+        mapped = mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped, digest.hexdigest()
+        finally:
+            mapped.close()
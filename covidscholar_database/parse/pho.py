@@ -3,15 +3,26 @@ from collections import OrderedDict
 from datetime import datetime
 from typing import Optional
 
+import gridfs
 from mongoengine import (
     DynamicDocument, ReferenceField, DateTimeField, StringField,
     IntField, LongField, ListField, BooleanField, connect)
+from mongoengine.connection import get_db
 
 from base import Parser, VespaDocument, indexes
 from utils import clean_title
+from dates import parse_datetime
+from pdf_extractor.paragraphs import iter_paragraphs_pdf, extractor_version
+from pdf_extractor.spool import spooled_gridfs_file
 
 latest_version = 1
 
+# Synopses are a few pages long, anything past this is not part of them
+pdf_max_pages = 10
+
+# fields parsed from the synopsis, the full text is only read to parse them
+synopsis_fields = ['abstract', 'has_full_text', 'body_text']
+
 class PHODocument(VespaDocument):
     meta = {
         "collection": "Scraper_publichealthontario_parsed_vespa",
@@ -35,7 +46,7 @@ class PHOParser(Parser):
         return 'Public Health Ontario Synopsis'
 
     def _parse_publication_date(self, doc):
-        return datetime.strptime(doc['Date_Created'].replace(',', '').strip(), '%B %d %Y')
+        return parse_datetime(doc['Date_Created'])
 
     def _parse_abstract(self, doc):
         paragraphs = [doc['Desc']]
@@ -115,6 +126,21 @@ class PHOFullText(DynamicDocument):
     pdf_extraction_version = StringField()
     parsed_date = DateTimeField()
 
+    def extract_paragraphs(self, max_pages=pdf_max_pages):
+        """Lays out the synopsis PDF stored in GridFS, page by page, into pdf_extraction_plist"""
+        paper_fs = gridfs.GridFS(get_db(), collection='Scraper_publichealthontario_fs')
+        try:
+            with spooled_gridfs_file(paper_fs.get(self.id)) as (pdf_file, _):
+                self.pdf_extraction_plist = list(iter_paragraphs_pdf(
+                    pdf_file, return_dicts=True, max_pages=max_pages))
+            self.pdf_extraction_success = True
+            self.pdf_extraction_exec = None
+        except Exception as e:
+            self.pdf_extraction_success = False
+            self.pdf_extraction_exec = repr(e)
+        self.pdf_extraction_version = extractor_version
+        self.parsed_date = datetime.now()
+
     def get_synopsis(self) -> Optional[OrderedDict]:
         sections = {}
         last_sec = None
@@ -134,6 +160,14 @@ class PHOFullText(DynamicDocument):
         return synopsis or None
 
 
+def extract_synopses(max_pages=pdf_max_pages):
+    """Lays out the synopsis PDFs that were never extracted and saves their paragraphs.
+    Run before parsing, UnparsedPHODocument.parse only reads pdf_extraction_plist."""
+    for fulltext in PHOFullText.objects(pdf_extraction_version=None):
+        fulltext.extract_paragraphs(max_pages=max_pages)
+        fulltext.save()
+
+
 class UnparsedPHODocument(DynamicDocument):
     meta = {
         "collection": "Scraper_publichealthontario"
@@ -146,11 +180,12 @@ class UnparsedPHODocument(DynamicDocument):
     parsed_document = ReferenceField(PHODocument, required=False)
     last_updated = DateTimeField()
 
-    def parse(self):
+    def parse(self, fields=None):
         doc = self.to_mongo()
-        doc['synopsis'] = self.fulltext.get_synopsis()
+        if fields is None or any(x in fields for x in synopsis_fields):
+            doc['synopsis'] = self.fulltext.get_synopsis() if self.fulltext is not None else None
 
-        parsed_document = self.parser.parse(doc)
+        parsed_document = self.parser.parse(doc, fields=fields)
         parsed_document['_bt'] = datetime.now()
         parsed_document['unparsed_document'] = self
         return PHODocument(**parsed_document)
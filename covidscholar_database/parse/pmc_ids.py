@@ -0,0 +1,171 @@
+"""
+Local copy of the DOI / PMID / PMCID mapping of NCBI, to answer find_remaining_ids
+without calling the idconv web service. The mapping is published as
+https://ftp.ncbi.nlm.nih.gov/pub/pmc/PMC-ids.csv.gz and compiled here into:
+
+    records.bin         'doi\\tpmcid\\tpmid' of every row, utf-8, one after the other
+    records.offsets     uint64 start of every row in records.bin, plus the end
+    {key}.hashes        sorted uint64 hashes of the normalized doi / pmcid / pmid
+    {key}.rows          uint32 row of each hash
+
+All of them are memory-mapped, so a lookup is a binary search that touches a
+few pages and the index costs no memory until it is used.
+"""
+
+import argparse
+import csv
+import hashlib
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+
+try:
+    from doi_key import canonical_doi
+except ImportError:
+    from covidscholar_database.parse.doi_key import canonical_doi
+
+KEYS = ['doi', 'pmcid', 'pmid']
+
+CSV_COLUMNS = {
+    'doi': 'DOI',
+    'pmcid': 'PMCID',
+    'pmid': 'PMID',
+}
+
+
+def normalize_id(key, value):
+    """
+    :param key: (str) one of KEYS
+    :param value: (str) id as written in PMC-ids.csv or given by the user
+    :return: (str) form of the id that is hashed
+    """
+    value = value.strip()
+    if key == 'pmcid':
+        value = value.upper()
+        if not value.startswith('PMC'):
+            value = 'PMC' + value
+    elif key == 'doi':
+        value = canonical_doi(value) or ''
+    return value
+
+
+def id_hash(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little'
+    )
+
+
+def guess_id_key(value):
+    """ Which kind of id the user gave, like idconv does"""
+    value = value.strip()
+    if value.upper().startswith('PMC'):
+        return 'pmcid'
+    if value.isdigit():
+        return 'pmid'
+    return 'doi'
+
+
+def compile_pmc_ids(csv_path, index_dir):
+    """
+    compile PMC-ids.csv into the memory-mapped index read by PMCIdIndex
+
+    :param csv_path: (str) path to PMC-ids.csv
+    :param index_dir: (str) folder to write the index to
+    :return: (int) number of rows indexed
+    """
+    os.makedirs(index_dir, exist_ok=True)
+
+    offsets = array('Q', [0])
+    hashes = {k: array('Q') for k in KEYS}
+    rows = {k: array('I') for k in KEYS}
+
+    with open(csv_path, newline='', encoding='utf-8') as fr, \
+            open(os.path.join(index_dir, 'records.bin'), 'wb') as fw:
+        reader = csv.DictReader(fr)
+        position = 0
+        for row_num, line in enumerate(reader):
+            values = [(line.get(CSV_COLUMNS[k]) or '').strip() for k in KEYS]
+            record = '\t'.join(values).encode('utf-8')
+            fw.write(record)
+            position += len(record)
+            offsets.append(position)
+            for k, value in zip(KEYS, values):
+                if value:
+                    hashes[k].append(id_hash(normalize_id(k, value)))
+                    rows[k].append(row_num)
+
+    with open(os.path.join(index_dir, 'records.offsets'), 'wb') as fw:
+        offsets.tofile(fw)
+
+    for k in KEYS:
+        order = sorted(range(len(hashes[k])), key=hashes[k].__getitem__)
+        with open(os.path.join(index_dir, k + '.hashes'), 'wb') as fw:
+            array('Q', (hashes[k][i] for i in order)).tofile(fw)
+        with open(os.path.join(index_dir, k + '.rows'), 'wb') as fw:
+            array('I', (rows[k][i] for i in order)).tofile(fw)
+
+    return len(offsets) - 1
+
+
+class PMCIdIndex(object):
+    """ Reader of the index written by compile_pmc_ids"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._files = []
+        self.records = self._map('records.bin')
+        self.offsets = self._map('records.offsets').cast('Q')
+        self.hashes = {k: self._map(k + '.hashes').cast('Q') for k in KEYS}
+        self.rows = {k: self._map(k + '.rows').cast('I') for k in KEYS}
+
+    def _map(self, name):
+        with open(os.path.join(self.index_dir, name), 'rb') as fr:
+            if os.fstat(fr.fileno()).st_size == 0:
+                return memoryview(b'')
+            mapped = mmap.mmap(fr.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(mapped)
+        return memoryview(mapped)
+
+    def _record(self, row):
+        record = bytes(self.records[self.offsets[row]:self.offsets[row + 1]])
+        return dict(zip(KEYS, record.decode('utf-8').split('\t')))
+
+    def lookup(self, value, key=None):
+        """
+        :param value: (str) a doi, pmid or pmcid
+        :param key: (str or None) kind of id, guessed from the value if None
+        :return: (dict or None) the row with keys 'doi', 'pmcid' and 'pubmed_id',
+            None if the id is not in PMC-ids.csv
+        """
+        key = key or guess_id_key(value)
+        value = normalize_id(key, value)
+        hashes = self.hashes[key]
+        h = id_hash(value)
+        i = bisect_left(hashes, h)
+        # rows sharing the hash are checked against the id itself
+        while i < len(hashes) and hashes[i] == h:
+            record = self._record(self.rows[key][i])
+            if normalize_id(key, record[key]) == value:
+                return {
+                    'doi': record['doi'] or None,
+                    'pmcid': record['pmcid'] or None,
+                    'pubmed_id': record['pmid'] or None,
+                }
+            i += 1
+        return None
+
+
+if __name__ == '__main__':
+
+    """
+    Compile the mapping, then point find_remaining_ids to it with the environment variable
+        PMC_IDS_INDEX: path/to/pmc_ids_index
+    """
+
+    arg_parser = argparse.ArgumentParser(description='Compile PMC-ids.csv into a memory-mapped index')
+    arg_parser.add_argument('csv_path', help='PMC-ids.csv, uncompressed')
+    arg_parser.add_argument('index_dir', help='folder to write the index to')
+    args = arg_parser.parse_args()
+
+    print('rows indexed:', compile_pmc_ids(args.csv_path, args.index_dir))
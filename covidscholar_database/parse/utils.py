@@ -1,6 +1,15 @@
-import requests
 import xml.etree.ElementTree as ET
 import json
+import os
+
+# one module for both import paths of utils, so that the process shares one session
+try:
+    from covidscholar_database.parse.http_client import get_session
+except ImportError:
+    from http_client import get_session
+
+# PMCIdIndex at $PMC_IDS_INDEX, loaded on first use
+pmc_id_index = None
 
 
 def clean_title(title):
@@ -36,7 +45,7 @@ def find_references(doi):
             'User-Agent': 'COVIDScholar Parsers',
             'From': 'jdagdelen@lbl.gov'  # This is another valid field
         }
-        response = requests.get(f"https://opencitations.net/index/api/v1/references/{doi}", headers=headers)
+        response = get_session().get(f"https://opencitations.net/index/api/v1/references/{doi}", headers=headers)
         if response:
             try:
                 response = response.json()
@@ -64,7 +73,7 @@ def find_cited_by(doi):
             'User-Agent': 'COVIDScholar Parsers',
             'From': 'jdagdelen@lbl.gov'  # This is another valid field
         }
-        response = requests.get(f"https://opencitations.net/index/api/v1/citations/{doi}", headers=headers)
+        response = get_session().get(f"https://opencitations.net/index/api/v1/citations/{doi}", headers=headers)
         if response:
             try:
                 response = response.json()
@@ -78,6 +87,21 @@ def find_cited_by(doi):
         return None
 
 
+def get_pmc_id_index():
+    """ Returns the PMCIdIndex compiled by pmc_ids.py at $PMC_IDS_INDEX, None if not set."""
+    global pmc_id_index
+    if pmc_id_index is None:
+        index_dir = os.getenv('PMC_IDS_INDEX')
+        if index_dir and os.path.isdir(index_dir):
+            # utils is imported both from the parse folder and as covidscholar_database.parse.utils
+            try:
+                from pmc_ids import PMCIdIndex
+            except ImportError:
+                from covidscholar_database.parse.pmc_ids import PMCIdIndex
+            pmc_id_index = PMCIdIndex(index_dir)
+    return pmc_id_index
+
+
 def find_remaining_ids(id):
     """ Returns dictionary containing remaining relevant ids corresponding to
     the input id. Just input doi, pmid, or pmcid; function will return all three.
@@ -99,17 +123,29 @@ def find_remaining_ids(id):
     if id is None:
         return None_dict
 
-    session = requests.Session()
+    # local copy of PMC-ids.csv, the network is only used for ids missing there
+    index = get_pmc_id_index()
+    if index is not None:
+        ids = index.lookup(id)
+        if ids is not None:
+            return ids
+
+    session = get_session()
     try:
         ids_url = 'https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/?ids=%s' % id
         response = session.get(ids_url)
         root = ET.fromstring(response.content)
-        ids = dict()
     except:
         return None_dict
     record = root.find('record')
     if record is None:
         return None_dict
+    return _idconv_record_ids(record)
+
+
+def _idconv_record_ids(record):
+    """ Returns the ids of a <record> element of an idconv response."""
+    ids = dict()
     if 'doi' in record.attrib:
         ids['doi'] = record.attrib['doi']
     else:
@@ -122,4 +158,48 @@ def find_remaining_ids(id):
         ids['pubmed_id'] = record.attrib['pmid']
     else:
         ids['pubmed_id'] = None
-    return ids
\ No newline at end of file
+    return ids
+
+
+def find_remaining_ids_batch(ids, batch_size=200):
+    """ Same as find_remaining_ids for many ids of the same kind (e.g. all dois),
+    with one idconv request per batch_size ids (200 at most) for the ids missing
+    from the local PMC-ids index.
+    Returns a dictionary id -> dictionary of find_remaining_ids.
+    """
+    None_dict = {
+        'doi': None,
+        'pmcid': None,
+        'pubmed_id': None
+    }
+    results = {}
+    missing = []
+    index = get_pmc_id_index()
+    for id in dict.fromkeys(ids):
+        if id is None:
+            continue
+        found = index.lookup(id) if index is not None else None
+        if found is not None:
+            results[id] = found
+        else:
+            missing.append(id)
+
+    session = get_session()
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i: i+batch_size]
+        for id in batch:
+            results[id] = dict(None_dict)
+        try:
+            response = session.get(
+                'https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/',
+                params={'ids': ','.join(batch)}
+            )
+            root = ET.fromstring(response.content)
+        except:
+            continue
+        requested = {id.lower(): id for id in batch}
+        for record in root.findall('record'):
+            id = requested.get(record.attrib.get('requested-id', '').lower())
+            if id is not None:
+                results[id] = _idconv_record_ids(record)
+    return results
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+package_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if package_root not in sys.path:
+    sys.path.insert(0, package_root)
+# the parsers import each other flat, from the parse folder
+parser_folder = os.path.join(package_root, 'covidscholar_database', 'parse')
+if parser_folder not in sys.path:
+    sys.path.append(parser_folder)
+
+# biorxiv creates its parser at import time, with a client connecting lazily to COVID_DB
+os.environ.setdefault('COVID_DB', 'covidscholar_test')
+
+
+@pytest.fixture
+def mongo_db():
+    """ mongoengine default connection to an in-memory database."""
+    disconnect()
+    connect('covidscholar_test', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient,
+            uuidRepresentation='standard')
+    yield
+    disconnect()
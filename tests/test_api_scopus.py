@@ -0,0 +1,68 @@
+import pytest
+
+from covidscholar_database.metadata.api_scopus import (
+    LocalScopusSearch, query_scopus_by_doi, query_scopus_by_dois, scopus_doi_batches)
+
+
+def test_batches_hold_at_most_max_batch_size_dois():
+    dois = ['10.1000/%d' % i for i in range(60)]
+    batches = list(scopus_doi_batches(dois))
+    assert [len(x) for x in batches] == [25, 25, 10]
+    assert sum(batches, []) == dois
+
+
+def test_batches_keep_the_or_query_under_max_query_length():
+    dois = ['10.1000/%s' % (str(i) * 40) for i in range(10)]
+    for batch in scopus_doi_batches(dois, max_query_length=200):
+        assert len(' OR '.join('DOI({})'.format(x) for x in batch)) <= 200
+    assert [len(x) for x in scopus_doi_batches(dois, max_query_length=200)] == [3, 3, 3, 1]
+
+
+def test_a_doi_longer_than_the_limit_gets_its_own_batch():
+    dois = ['10.1000/a', '10.1000/' + 'x' * 300, '10.1000/b']
+    assert list(scopus_doi_batches(dois, max_query_length=100)) == [[dois[0]], [dois[1]], [dois[2]]]
+
+
+def test_query_scopus_by_dois_sends_or_queries_and_maps_results_back():
+    search = LocalScopusSearch([
+        {'doi': '10.1000/ABC', 'eid': '2-s2.0-1'},
+        {'doi': '10.1000/def', 'eid': '2-s2.0-2'},
+        {'doi': '10.1000/unrelated', 'eid': '2-s2.0-3'},
+    ])
+    results = query_scopus_by_dois(['10.1000/abc', '10.1000/def', '10.1000/none'], search=search)
+
+    assert search.queries == ['DOI(10.1000/abc) OR DOI(10.1000/def) OR DOI(10.1000/none)']
+    assert results['10.1000/abc']['eid'] == '2-s2.0-1'
+    assert results['10.1000/def']['eid'] == '2-s2.0-2'
+    assert results['10.1000/none'] is None
+
+
+def test_query_scopus_by_dois_one_query_per_batch():
+    search = LocalScopusSearch([{'doi': '10.1000/%d' % i, 'eid': str(i)} for i in range(30)])
+    results = query_scopus_by_dois(['10.1000/%d' % i for i in range(30)], search=search)
+    assert len(search.queries) == 2
+    assert {doi: r['eid'] for doi, r in results.items()} == {'10.1000/%d' % i: str(i) for i in range(30)}
+
+
+def test_a_failed_batch_is_retried_doi_by_doi():
+    class FailingSearch(LocalScopusSearch):
+        def __call__(self, query, max_entries=None, cursor=True):
+            if 'bad' in query:
+                self.queries.append(query)
+                raise ValueError('malformed query')
+            return super().__call__(query, max_entries, cursor)
+
+    search = FailingSearch([{'doi': '10.1000/a', 'eid': '1'}])
+    results = query_scopus_by_dois(['10.1000/a', '10.1000/bad'], search=search)
+    assert results == {'10.1000/a': {'doi': '10.1000/a', 'eid': '1'}}
+    assert search.queries[1:] == ['DOI(10.1000/a)', 'DOI(10.1000/bad)']
+
+
+def test_instances_do_not_share_state():
+    first = LocalScopusSearch([{'doi': '10.1000/a'}])
+    second = LocalScopusSearch()
+    with pytest.warns(UserWarning):
+        assert query_scopus_by_doi('10.1000/a', search=second) is None
+    assert query_scopus_by_doi('10.1000/a', search=first) == {'doi': '10.1000/a'}
+    assert first.queries == ['DOI(10.1000/a)'] and second.queries == ['DOI(10.1000/a)']
+    assert second.records == []
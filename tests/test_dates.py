@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from covidscholar_database.parse.dates import parse_datetime
+
+
+def test_parse_datetime_fills_the_missing_parts():
+    assert parse_datetime('2020-03-15') == datetime(2020, 3, 15)
+    assert parse_datetime('2020 Mar 3') == datetime(2020, 3, 3)
+    assert parse_datetime('2020') == datetime(2020, 1, 1)
+
+
+def test_parse_datetime_rejects_invalid_dates():
+    assert parse_datetime('2020-02-30') is None
+    assert parse_datetime('not a date') is None
+    assert parse_datetime(None) is None
+    assert parse_datetime(2020) is None
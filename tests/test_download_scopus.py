@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from covidscholar_database.metadata import download_scopus
+
+
+@pytest.fixture
+def aug_col():
+    col = mongomock.MongoClient()['covidscholar_test']['metadata_from_api']
+    col.insert_many([{'doi': '10.1000/%d' % i} for i in range(10)])
+    return col
+
+
+def test_claims_do_not_overlap(aug_col):
+    first = download_scopus.claim_scopus_block(aug_col, 4, worker_id='a')
+    second = download_scopus.claim_scopus_block(aug_col, 10, worker_id='b')
+    assert len(first) == 4 and len(second) == 6
+    assert not {x['_id'] for x in first} & {x['_id'] for x in second}
+    assert download_scopus.claim_scopus_block(aug_col, 10, worker_id='c') == []
+    assert aug_col.count_documents({'lease_owner': 'a'}) == 4
+
+
+def test_expired_leases_are_claimed_again(aug_col):
+    download_scopus.claim_scopus_block(aug_col, 10, worker_id='a')
+    aug_col.update_many({}, {'$set': {'lease_until': datetime.now() - timedelta(seconds=1)}})
+    assert len(download_scopus.claim_scopus_block(aug_col, 10, worker_id='b')) == 10
+
+
+def test_failed_dois_are_released_and_not_retried_in_the_run(aug_col, monkeypatch):
+    calls = []
+
+    def query_scopus_by_dois(dois):
+        calls.append(list(dois))
+        return {doi: {'eid': doi} for doi in dois if not doi.endswith(('/1', '/2'))}
+
+    monkeypatch.setattr(download_scopus, 'query_scopus_by_dois', query_scopus_by_dois)
+    download_scopus.collect_scopus_data(aug_col.database, num_blocks=5, block_size=4)
+
+    assert sum(len(x) for x in calls) == 10
+    assert aug_col.count_documents({'scopus_raw_result': {'$exists': True}}) == 8
+    assert aug_col.count_documents({'lease_owner': {'$exists': True}}) == 0
+    failed = aug_col.find({'scopus_raw_result': {'$exists': False}})
+    assert sorted(x['doi'] for x in failed) == ['10.1000/1', '10.1000/2']
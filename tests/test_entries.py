@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from covidscholar_database.builder import entries
+from covidscholar_database.parse import dimensions
+from covidscholar_database.parse.lens_patents import LensPatentDocument
+
+
+def network(*args):
+    raise AssertionError('network helper called while matching')
+
+
+def insert_entry(**ids):
+    entry = {'doi': None, 'pubmed_id': None, 'pmcid': None, 'scopus_eid': None}
+    entry.update(ids)
+    entry['doi_key'] = entries.canonical_doi(entry['doi'])
+    return entries.EntriesDocument._get_collection().insert_one(entry).inserted_id
+
+
+def test_find_matching_doc_on_parsed_document(mongo_db):
+    entry_id = insert_entry(doi='10.1000/abc', pmcid='PMC1')
+    insert_entry(doi='10.1000/other')
+
+    parsed = LensPatentDocument(doi='https://doi.org/10.1000/ABC', title='Title')
+    assert [x.id for x in entries.find_matching_doc(parsed)] == [entry_id]
+    assert entries.find_matching_doc(LensPatentDocument(doi='10.1000/none')) == []
+
+
+def test_find_matching_doc_parses_only_the_ids_of_a_raw_source(mongo_db, monkeypatch):
+    entry_id = insert_entry(doi='10.1000/abc', pubmed_id='32000001')
+    for helper in ['find_references', 'find_cited_by', 'find_remaining_ids']:
+        monkeypatch.setattr(dimensions, helper, network)
+
+    source = dimensions.UnparsedDimensionsPubDocument(
+        doi='10.1000/ABC', pmcid='PMC2', pmid='32000001', title='Title',
+        last_updated=datetime(2020, 5, 1))
+    assert [x.id for x in entries.find_matching_doc(source)] == [entry_id]
+
+
+def test_find_unmatched_sources(mongo_db, monkeypatch):
+    insert_entry(doi='10.1000/abc')
+    monkeypatch.setattr(dimensions, 'find_remaining_ids', network)
+    for doi in ['10.1000/abc', '10.1000/new']:
+        dimensions.UnparsedDimensionsPubDocument(
+            doi=doi, pmcid='PMC1', pmid='1', last_updated=datetime(2020, 5, 1)).save()
+
+    unmatched = list(entries.find_unmatched_sources(dimensions.UnparsedDimensionsPubDocument))
+    assert [x.doi for x in unmatched] == ['10.1000/new']
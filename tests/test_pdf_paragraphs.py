@@ -0,0 +1,55 @@
+import os
+import sys
+from io import BytesIO
+
+benchmarks_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+if benchmarks_folder not in sys.path:
+    sys.path.append(benchmarks_folder)
+
+import pdf_corpus
+from covidscholar_database.parse.pdf_extractor import paragraphs
+from covidscholar_database.parse.pdf_extractor.cache import params_hash
+
+BODY = 'Patients with severe acute respiratory syndrome were enrolled in the cohort study of page %d.'
+
+
+def paper_pdf(num_pages, references_page):
+    pages = []
+    for page_num in range(num_pages):
+        lines = [(54, 756, 8, 'medRxiv preprint running header')]
+        if page_num == references_page:
+            lines.append((54, 600, 14, 'References'))
+        else:
+            lines.append((54, 600, 10, BODY % page_num))
+        pages.append(lines)
+    return pdf_corpus.build_pdf(pages)
+
+
+def extract(pdf, monkeypatch, **kwargs):
+    laid_out = []
+    process_page = paragraphs.PDFPageInterpreter.process_page
+
+    def counting_process_page(self, page):
+        laid_out.append(page)
+        return process_page(self, page)
+
+    monkeypatch.setattr(paragraphs.PDFPageInterpreter, 'process_page', counting_process_page)
+    texts = list(paragraphs.iter_paragraphs_pdf(BytesIO(pdf), **kwargs))
+    return texts, len(laid_out)
+
+
+def test_bounded_lookahead_stops_laying_out_at_the_references(monkeypatch):
+    pdf = paper_pdf(num_pages=20, references_page=2)
+
+    texts, num_laid_out = extract(pdf, monkeypatch, stop_at_references=True, lookahead=2)
+    assert texts == [BODY % 0, BODY % 1]
+    assert num_laid_out <= 5
+
+    texts, num_laid_out = extract(pdf, monkeypatch, stop_at_references=True)
+    assert texts == [BODY % 0, BODY % 1]
+    assert num_laid_out == 20
+
+
+def test_lookahead_is_part_of_the_cache_key():
+    assert params_hash(None, max_pages=50, stop_at_references=True) != \
+        params_hash(None, max_pages=50, stop_at_references=True, lookahead=2)
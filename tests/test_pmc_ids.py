@@ -0,0 +1,37 @@
+import pytest
+
+from covidscholar_database.parse.pmc_ids import PMCIdIndex, compile_pmc_ids
+
+CSV = """Journal Title,ISSN,eISSN,Year,Volume,Issue,Page,DOI,PMCID,PMID,Manuscript Id,Release Date,
+Journal A,,,2020,1,1,1,10.1000/ABC,PMC100,32000001,,live,
+Journal B,,,2020,1,1,2,,PMC200,32000002,,live,
+Journal C,,,2020,1,1,3,10.1000/only-doi,PMC300,,,live,
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    csv_path = tmp_path / 'PMC-ids.csv'
+    csv_path.write_text(CSV)
+    assert compile_pmc_ids(str(csv_path), str(tmp_path / 'index')) == 3
+    return PMCIdIndex(str(tmp_path / 'index'))
+
+
+def test_lookup_by_any_id(index):
+    row = {'doi': '10.1000/ABC', 'pmcid': 'PMC100', 'pubmed_id': '32000001'}
+    assert index.lookup('32000001') == row
+    assert index.lookup('PMC100') == row
+    assert index.lookup('pmc100') == row
+    assert index.lookup('100', key='pmcid') == row
+
+
+def test_lookup_normalizes_the_doi(index):
+    assert index.lookup('https://doi.org/10.1000/abc')['pmcid'] == 'PMC100'
+    assert index.lookup('10.1000/ONLY-DOI') == {'doi': '10.1000/only-doi', 'pmcid': 'PMC300', 'pubmed_id': None}
+
+
+def test_lookup_of_missing_ids(index):
+    assert index.lookup('32000002')['doi'] is None
+    assert index.lookup('10.1000/missing') is None
+    assert index.lookup('PMC999') is None
+    assert index.lookup('1') is None
@@ -0,0 +1,111 @@
+"""
+Selective reparse of builder/vespa.py on parser version bumps.
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from covidscholar_database.builder import vespa
+from covidscholar_database.parse import biorxiv, litcovid, pho
+
+
+class ParsedDocument(dict):
+    """ Parsed document whose fields are also attributes, as on a VespaDocument."""
+    latest_version = biorxiv.latest_version
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def find_missing_ids(self):
+        self.ids_searched = True
+
+    def save(self):
+        self.saved = True
+
+    def delete(self):
+        self.deleted = True
+
+
+class UnparsedDocument(object):
+    parser = biorxiv.BiorxivParser()
+
+    def __init__(self, parsed_document, last_updated):
+        self.parsed_document = parsed_document
+        self.last_updated = last_updated
+        self.parse_calls = []
+        self.saved = False
+
+    def parse(self, fields=None):
+        self.parse_calls.append(fields)
+        return ParsedDocument(_bt=datetime.now(), body_text=[{'section_heading': None, 'text': 'new'}],
+                              version=biorxiv.latest_version, title='new title')
+
+    def save(self):
+        self.saved = True
+
+
+def test_biorxiv_declares_body_text_change():
+    assert biorxiv.BiorxivParser.version_changes[biorxiv.latest_version] == ['body_text']
+    assert UnparsedDocument.parser.changed_fields(3, 4) == ['body_text', 'version']
+    assert UnparsedDocument.parser.changed_fields(2, 4) is None
+
+
+def test_version_bump_reparses_changed_fields_only():
+    parsed_at = datetime.now()
+    parsed_document = ParsedDocument(_bt=parsed_at, body_text=None, version=3, title='old title')
+    document = UnparsedDocument(parsed_document, last_updated=parsed_at - timedelta(days=1))
+
+    vespa.parse_document(document)
+
+    assert document.parse_calls == [['body_text', 'version']]
+    assert parsed_document['body_text'] == [{'section_heading': None, 'text': 'new'}]
+    assert parsed_document['version'] == biorxiv.latest_version
+    assert parsed_document['title'] == 'old title'
+    assert parsed_document._bt > parsed_at
+    assert parsed_document.saved and 'deleted' not in parsed_document
+    assert 'ids_searched' not in parsed_document
+    assert document.parsed_document is parsed_document and not document.saved
+
+
+def test_fresh_source_is_fully_reparsed():
+    parsed_at = datetime.now()
+    parsed_document = ParsedDocument(_bt=parsed_at, body_text=None, version=3, title='old title')
+    document = UnparsedDocument(parsed_document, last_updated=parsed_at + timedelta(days=1))
+
+    vespa.parse_document(document)
+
+    assert document.parse_calls == [None]
+    assert parsed_document.deleted
+    assert document.parsed_document['title'] == 'new title'
+    assert document.parsed_document.saved and document.saved
+
+
+def test_pho_subset_parse_skips_the_synopsis(monkeypatch):
+    def get_synopsis(self):
+        raise AssertionError('synopsis read for a field subset')
+
+    monkeypatch.setattr(pho.PHOFullText, 'get_synopsis', get_synopsis)
+    document = pho.UnparsedPHODocument(fulltext=pho.PHOFullText(id=ObjectId()), Title='Title', Authors=[])
+    parsed = document.parse(fields=['title', 'version'])
+    assert parsed.title == 'Synopsis: Review of "Title"'
+    assert parsed.version == pho.latest_version
+
+
+def test_pho_parse_without_fulltext():
+    document = pho.UnparsedPHODocument(Title='Title', Authors=['A B'], Desc='Description',
+                                       Date_Created='March 3, 2020', Synopsis_Link='https://example.org',
+                                       last_updated=datetime(2020, 3, 3))
+    parsed = document.parse()
+    assert parsed.abstract == 'Description'
+    assert not parsed.body_text and parsed.has_full_text is False
+
+
+def test_litcovid_declares_authors_change():
+    assert litcovid.latest_version == 4
+    assert litcovid.LitCovidParser().changed_fields(3, 4) == ['authors', 'version']
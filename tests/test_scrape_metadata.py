@@ -0,0 +1,46 @@
+import mongomock
+import pytest
+
+from covidscholar_database.metadata import scrape_metadata_by_api
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()['covidscholar_test']
+
+
+def test_collect_crossref_data_updates_the_record_of_the_same_doi_key(db, monkeypatch):
+    db['CORD_comm_use_subset'].insert_many([
+        {'doi': 'https://doi.org/10.1000/ABC'},
+        {'doi': '10.1000/new'},
+    ])
+    db['metadata_from_api'].insert_one({'doi': '10.1000/abc', 'scopus_raw_result': {'eid': '2-s2.0-1'}})
+    monkeypatch.setattr(scrape_metadata_by_api, 'query_crossref_by_doi', lambda doi: {'DOI': doi})
+
+    scrape_metadata_by_api.collect_crossref_data(db)
+
+    records = {x['doi_key']: x for x in db['metadata_from_api'].find()}
+    assert sorted(records) == ['10.1000/abc', '10.1000/new']
+    assert records['10.1000/abc']['doi'] == '10.1000/abc'
+    assert records['10.1000/abc']['scopus_raw_result'] == {'eid': '2-s2.0-1'}
+    assert records['10.1000/abc']['crossref_raw_result'] == {'DOI': '10.1000/ABC'}
+    assert records['10.1000/new']['doi'] == '10.1000/new'
+
+
+def test_plan_missing_dois_dedupes_on_doi_key(db):
+    db['CORD_comm_use_subset'].insert_many([
+        {'doi': 'https://doi.org/10.1000/ABC'},
+        {'doi': '10.1000/abc'},
+        {'doi': '10.1000/done'},
+        {'doi': ''},
+        {'title': 'no doi'},
+    ])
+    db['Dimensions_publications'].insert_many([{'doi': '10.1000/NEW'}, {'doi': '10.1000/scopus-only'}])
+    db['not_a_paper_collection'].insert_one({'doi': '10.1000/other'})
+    db['metadata_from_api'].insert_many([
+        {'doi': 'https://doi.org/10.1000/DONE', 'crossref_raw_result': {}},
+        {'doi': '10.1000/scopus-only', 'scopus_raw_result': {}},
+    ])
+
+    todo = scrape_metadata_by_api.plan_missing_dois(db, {'crossref_raw_result': {'$exists': True}})
+    assert todo == ['10.1000/ABC', '10.1000/NEW', '10.1000/scopus-only']